@@ -1,12 +1,16 @@
 from flask import Flask
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from app.models import db, User, Review, UserRequirements, Message
+from app.models import db, User, Review, UserRequirements, Message, AuditJob
+from app.utils import (
+    account_lifecycle, ai_backend, audit_jobs, data_store, db_engine, instrumentation, passwords, profiler,
+    schema, user_repository,
+)
 import os
 import secrets
 
 # Put some boilerplate code to create app
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # Configuration with better security defaults
@@ -22,6 +26,17 @@ def create_app():
     app.config['SECRET_KEY'] = secret_key
     app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///course_compass.db'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Engine tuning, see app/utils/db_engine.py (SQLite or Postgres settings apply by URL)
+    app.config['DB_SQLITE_WAL'] = os.environ.get('DB_SQLITE_WAL', '1') == '1'
+    app.config['DB_SQLITE_SYNCHRONOUS'] = os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['DB_BUSY_TIMEOUT'] = int(os.environ.get('DB_BUSY_TIMEOUT', 5000))  # ms
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # auto, check, create or skip; see app/utils/schema.py (tables come from 'flask db upgrade')
+    app.config['DB_SCHEMA'] = os.environ.get('DB_SCHEMA', 'auto')
     
     # Additional security configurations
     app.config['WTF_CSRF_ENABLED'] = True
@@ -29,10 +44,75 @@ def create_app():
     app.config['SESSION_COOKIE_SECURE'] = os.environ.get('FLASK_ENV') != 'development'
     app.config['SESSION_COOKIE_HTTPONLY'] = True
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+
+    # AI assistant (AI_BACKEND=fake runs without the Gemini API)
+    app.config['AI_BACKEND'] = os.environ.get('AI_BACKEND', 'gemini')
+    app.config['AI_MODEL'] = os.environ.get('AI_MODEL', 'gemini-2.5-flash')
+    app.config['AI_CACHE_SIZE'] = int(os.environ.get('AI_CACHE_SIZE', 512))
+    app.config['AI_CACHE_TTL'] = int(os.environ.get('AI_CACHE_TTL', 3600))
+    app.config['AI_STREAM_WORKERS'] = int(os.environ.get('AI_STREAM_WORKERS', 8))
+    app.config['AI_STREAM_TIMEOUT'] = int(os.environ.get('AI_STREAM_TIMEOUT', 90))
+
+    # Degree audit parsing (AUDIT_QUEUE=inline parses in the request, for tests)
+    app.config['AUDIT_QUEUE'] = os.environ.get('AUDIT_QUEUE', 'process')
+    app.config['AUDIT_WORKERS'] = int(os.environ.get('AUDIT_WORKERS', 2))
+    app.config['AUDIT_PAGE_BATCH'] = int(os.environ.get('AUDIT_PAGE_BATCH', 4))
+    # Audits this long are split across the workers; 0 never splits (it didn't pay off when measured)
+    app.config['AUDIT_PARALLEL_PAGES'] = int(os.environ.get('AUDIT_PARALLEL_PAGES', 0))
+    app.config['AUDIT_MAX_ATTEMPTS'] = int(os.environ.get('AUDIT_MAX_ATTEMPTS', 3))
+    app.config['AUDIT_JOB_TIMEOUT'] = int(os.environ.get('AUDIT_JOB_TIMEOUT', 300))
+    app.config['AUDIT_UPLOAD_DIR'] = os.environ.get('AUDIT_UPLOAD_DIR') or os.path.join(app.instance_path, 'audit_uploads')
+    app.config['AUDIT_CACHE_DIR'] = os.environ.get('AUDIT_CACHE_DIR') or os.path.join(app.instance_path, 'audit_cache')
+    app.config['AUDIT_CACHE_SIZE'] = int(os.environ.get('AUDIT_CACHE_SIZE', 1000))
+
+    # Build the course search index when the app starts instead of on the first search
+    app.config['SEARCH_INDEX_AT_STARTUP'] = os.environ.get('SEARCH_INDEX_AT_STARTUP', '1') == '1'
+
+    # Where reviews and chat messages live: supabase or sqlalchemy (the app database)
+    app.config['DATA_STORE'] = os.environ.get('DATA_STORE', 'supabase')
+
+    # Server-Timing headers on every response (on by default only in debug),
+    # and /metrics, which only exists when METRICS_TOKEN is set
+    app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '1' if app.debug else '0') == '1'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    # User ids allowed to run the sampling profiler at /admin/profile (comma-separated)
+    app.config['ADMIN_USER_IDS'] = os.environ.get('ADMIN_USER_IDS', '')
+    app.config['PROFILER_MAX_SECONDS'] = float(os.environ.get('PROFILER_MAX_SECONDS', 30))
+
+    # Logged-in users are cached in each process for USER_CACHE_TTL seconds
+    # (writes always re-read the user, see app/utils/user_repository.py)
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 30))
+
+    # Account deletion (ACCOUNT_DELETE_QUEUE=inline deletes in the request, for tests)
+    app.config['ACCOUNT_DELETE_QUEUE'] = os.environ.get('ACCOUNT_DELETE_QUEUE', 'thread')
+    app.config['ACCOUNT_DELETE_BATCH'] = int(os.environ.get('ACCOUNT_DELETE_BATCH', 500))
+
+    # Password hashing cost is measured at startup unless pinned
+    app.config['PASSWORD_HASH_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0))
+    app.config['PASSWORD_HASH_TARGET_MS'] = int(os.environ.get('PASSWORD_HASH_TARGET_MS', 150))
+    app.config['PASSWORD_HASH_MIN_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_MIN_ITERATIONS', 600000))
+    app.config['PASSWORD_HASH_MAX_ITERATIONS'] = int(os.environ.get('PASSWORD_HASH_MAX_ITERATIONS', 1000000))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 2))
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+
+    if test_config:
+        app.config.update(test_config)
+    app.config['SQLALCHEMY_DATABASE_URI'] = db_engine.normalize_uri(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', db_engine.engine_options(app.config))
     
     # Initialize extensions
     db.init_app(app)
-    migrate = Migrate(app, db)
+    db_engine.init_app(app, db)
+    instrumentation.init_app(app, db)
+    migrate = Migrate(app, db, directory=schema.MIGRATIONS_DIR)
+    ai_backend.init_app(app)
+    audit_jobs.init_app(app)
+    user_repository.init_app(app)
+    data_store.init_app(app)
+    passwords.init_app(app)
+    account_lifecycle.init_app(app)
+    profiler.init_app(app)
     
     # Setup Flask-Login
     login_manager = LoginManager()
@@ -43,12 +123,13 @@ def create_app():
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+        # A cached UserPrincipal; routes that change the user fetch the User
+        principal = app.extensions['users'].principal(int(user_id))
+        # Deactivated (e.g. being deleted) accounts are logged out everywhere
+        return principal if principal is not None and principal.is_active is not False else None
     
+    schema.init_app(app, db)
+
     # Register blueprints
     from app.routes import bp
     app.register_blueprint(bp)
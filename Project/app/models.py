@@ -77,6 +77,41 @@ class UserRequirements(db.Model):
     def __repr__(self):
         return f'<UserRequirements for {self.user.email}>'
 
+class AuditJob(db.Model):
+    """A degree audit upload waiting for (or done with) background parsing"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+
+    # SHA-256 of the uploaded PDF, used to spot repeated uploads
+    file_hash = db.Column(db.String(64), nullable=False)
+    file_path = db.Column(db.String(500))
+
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    result = db.Column(db.Text)  # parsed requirements as JSON
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_audit_job_user_hash', 'user_id', 'file_hash'),)
+
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    def __repr__(self):
+        return f'<AuditJob {self.id} {self.status}>'
+
 class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     course_code = db.Column(db.String(20), nullable=False, index=True)
@@ -101,6 +136,11 @@ class Review(db.Model):
     # Moderation
     is_flagged = db.Column(db.Boolean, default=False)
     is_approved = db.Column(db.Boolean, default=True)
+
+    __table_args__ = (
+        # One review per user per course; also serves "my review for this course"
+        db.UniqueConstraint('user_id', 'course_code', name='uq_review_user_course'),
+    )
     
     def __repr__(self):
         return f'<Review {self.course_code} by {self.author.name}>'
@@ -155,6 +195,12 @@ class Message(db.Model):
     # Moderation
     is_flagged = db.Column(db.Boolean, default=False)
     is_deleted = db.Column(db.Boolean, default=False)
+
+    __table_args__ = (
+        # Course chat: live messages, newest first (deleted ones aren't indexed)
+        db.Index('ix_message_course_live_created', 'course_code', 'created_at',
+                 sqlite_where=db.text('is_deleted = 0'), postgresql_where=db.text('is_deleted = false')),
+    )
     
     def __repr__(self):
         return f'<Message {self.id} in {self.course_code} by {self.author.name}>'
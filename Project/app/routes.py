@@ -1,32 +1,36 @@
 from __future__ import annotations
 
 import csv
-import re
 from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List
-from werkzeug.security import generate_password_hash, check_password_hash
 
-from flask import Blueprint, json, jsonify, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, Response, current_app, json, jsonify, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
-from google import genai
-from google.genai import types
+import hashlib
 import os
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-import requests
+import queue
 
-from app.models import db, User, Review, UserRequirements, Message
+from app.models import db, UserRequirements
 from app.forms import LoginForm, RegisterForm, ReviewForm, EditReviewForm
-from app.utils.gpa_calculator import get_course_gpa_stats
-from app import super as sb
+from app.utils.gpa_calculator import get_course_gpa_stats, load_course_gpas
+from app.utils.course_search import CourseSearchIndex, rank
+from app.utils.course_query import CatalogIndex, plan_query, execute_plan, split_geneds
+from app.utils.course_retrieval import CourseRetriever, format_course_context
+from app.utils.gened_index import GENED_FLAGS, RequirementIndex
+from app.utils import ai_backend
+from app.utils.instrumentation import span
+from app.utils.passwords import PasswordHasherBusy
+from app.utils.user_repository import live_user_required
 
 from datetime import datetime
 
 bp = Blueprint('main', __name__)
 
 DATA_PATH = Path(__file__).resolve().parent / 'all_courses.csv'
-_GENED_SPLIT = re.compile(r'[;,]')
+
+# Number of locally retrieved courses the AI assistant gets to choose from
+AI_CANDIDATE_COURSES = 40
 
 # Google OAuth Configuration
 GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
@@ -39,6 +43,8 @@ GOOGLE_DISCOVERY_URL = os.environ.get(
 
 def get_google_provider_cfg():
     """Get Google's OAuth 2.0 provider configuration."""
+    import requests
+
     return requests.get(GOOGLE_DISCOVERY_URL).json()
 
 
@@ -56,7 +62,8 @@ def get_or_create_user_from_google(user_info):
         return None, "Only @illinois.edu email addresses are allowed to register."
 
     # Check if user exists
-    user = User.query.filter_by(email=email.lower()).first()
+    users = current_app.extensions['users']
+    user = users.get_by_email(email)
 
     if user:
         return user, None
@@ -65,14 +72,10 @@ def get_or_create_user_from_google(user_info):
     netid = email.split("@")[0]
 
     # Create new user (no password needed for OAuth users)
-    user = User(
-        email=email.lower(),
-        name=name or netid,
-        username=netid,  # Set username as netid by default
-        password_hash=""  # OAuth users don't need password initially
-    )
-    db.session.add(user)
-    db.session.commit()
+    user = users.create(name=name or netid, email=email, password_hash="")
+    if user is None:
+        # Created by a concurrent sign-in
+        user = users.get_by_email(email)
 
     return user, None
 
@@ -101,16 +104,38 @@ def _load_courses() -> List[CourseRecord]:
     return courses
 
 
+@lru_cache(maxsize=1)
+def _search_index() -> CourseSearchIndex:
+    return CourseSearchIndex(_load_courses())
+
+
+@bp.record_once
+def _build_search_index(state) -> None:
+    # Takes most of a second, which would otherwise land on the first search
+    if state.app.config.get('SEARCH_INDEX_AT_STARTUP'):
+        _search_index()
+
+
+@lru_cache(maxsize=1)
+def _catalog_index() -> CatalogIndex:
+    return CatalogIndex(_load_courses())
+
+
+@lru_cache(maxsize=1)
+def _course_retriever() -> CourseRetriever:
+    return CourseRetriever(_load_courses())
+
+
+@lru_cache(maxsize=1)
+def _requirement_index() -> RequirementIndex:
+    return RequirementIndex(_load_courses(), load_course_gpas())
+
+
 @bp.route('/api/courses/meta')
 def courses_meta():
     courses = _load_courses()
     departments = sorted({course['department'] for course in courses if course['department']})
-    geneds = sorted({
-        part.strip()
-        for course in courses
-        for part in _GENED_SPLIT.split(course['gen_ed_requirements'])
-        if part.strip()
-    })
+    geneds = sorted({gened for course in courses for gened in split_geneds(course['gen_ed_requirements'])})
     return jsonify({'departments': departments, 'geneds': geneds})
 
 
@@ -127,81 +152,65 @@ def api_courses():
 
     limit = min(max(request.args.get('limit', default=30, type=int), 1), 120)
 
-    def matches(course: CourseRecord) -> bool:
-        if department != 'all' and course['department'] != department:
-            return False
-        if required_geneds:
-            course_geneds = [
-                part.strip()
-                for part in _GENED_SPLIT.split(course['gen_ed_requirements'])
-                if part.strip()
-            ]
-            # Course must have ALL required gen eds
-            for required_gened in required_geneds:
-                # Special case for combined Humanities requirement
-                if required_gened == 'Humanities':
-                    humanities_found = any(
-                        gened in ['Humanities - Hist & Phil', 'Humanities - Lit & Arts']
-                        for gened in course_geneds
-                    )
-                    if not humanities_found:
-                        return False
-                else:
-                    if required_gened not in course_geneds:
-                        return False
-        if query:
-            haystack = f"{course['course_code']} {course['course_name']} {course['description']}".lower()
-            if query not in haystack:
-                return False
-        return True
-
-    filtered = [course for course in courses if matches(course)]
-    
-    # Sort by search relevance if there's a query
-    if query:
-        def get_search_score(course: CourseRecord) -> int:
-            """Calculate search relevance score (higher = more relevant)"""
-            score = 0
-            course_code_lower = course['course_code'].lower()
-            course_name_lower = course['course_name'].lower()
-            
-            # Highest priority: exact match in course code
-            if query == course_code_lower:
-                score += 1000
-            # High priority: query starts course code
-            elif course_code_lower.startswith(query):
-                score += 800
-            # Medium-high priority: query in course code
-            elif query in course_code_lower:
-                score += 600
-                
-            # High priority: exact match in course name
-            if query == course_name_lower:
-                score += 900
-            # Medium-high priority: query starts course name
-            elif course_name_lower.startswith(query):
-                score += 700
-            # Medium priority: query in course name
-            elif query in course_name_lower:
-                score += 500
-                
-            # Lower priority: query in description
-            if query in course['description'].lower():
-                score += 100
-                
-            return score
-        
-        filtered.sort(key=get_search_score, reverse=True)
-    
-    limited = filtered[:limit]
-
-    return jsonify(
+    # Rank with the search index if there's a query
+    with span('search'):
+        scores = _search_index().scores(query) if query else None
+    with span('catalog'):
+        plan = plan_query(_catalog_index(), department, required_geneds, scores)
+        first, candidates, total = execute_plan(plan, len(courses), limit)
+    if scores is not None:
+        with span('search'):
+            first = rank(scores, candidates, limit=limit)
+    limited = [courses[doc] for doc in first]
+
+    response = jsonify(
         {
             'results': limited,
-            'matches': len(filtered),
+            'matches': total,
             'limit': limit,
         }
     )
+    if current_app.debug or request.args.get('explain'):
+        response.headers['X-Query-Plan'] = plan.describe(limit)
+    return response
+
+
+@bp.route('/api/recommendations/geneds')
+@login_required
+def gened_recommendations():
+    """Courses ranked by how many of the user's unmet gen-ed requirements they cover"""
+    requirements = UserRequirements.query.filter_by(user_id=current_user.id).first()
+    unmet = [
+        flag for flag in GENED_FLAGS.values()
+        if requirements is None or not getattr(requirements, flag)
+    ]
+    # Optionally narrow down to some of them, e.g. ?requirements=humanities_hp,western_culture
+    requested = request.args.get('requirements', default='').strip()
+    if requested:
+        wanted = {flag.strip() for flag in requested.split(',')}
+        unmet = [flag for flag in unmet if flag in wanted]
+
+    limit = min(max(request.args.get('limit', default=20, type=int), 1), 100)
+    results, total = _requirement_index().recommend(unmet, limit=limit)
+
+    return jsonify({
+        'audit_uploaded': bool(requirements and requirements.audit_uploaded),
+        'unmet': unmet,
+        'results': [
+            {
+                'course_code': course['course_code'],
+                'course_name': course['course_name'],
+                'credit_hours': course['credit_hours'],
+                'gen_ed_requirements': course['gen_ed_requirements'],
+                'covers': covers,
+                'gpa': gpa,
+            }
+            for course, covers, gpa in results
+        ],
+        'matches': total,
+        'limit': limit,
+    })
+
 
 @bp.route('/')
 def index():
@@ -211,20 +220,24 @@ def index():
 def course_detail(course_code):
 
     
-    courses = _load_courses()
-    course = next((c for c in courses if c['course_code'] == course_code), None)
+    with span('catalog'):
+        courses = _load_courses()
+        course = next((c for c in courses if c['course_code'] == course_code), None)
     
     if not course:
         return render_template('404.html', course_code=course_code), 404
     
     # Find related courses in same department
-    related_courses = [
-        c for c in courses
-        if c['department'] == course['department'] and c['course_code'] != course_code
-    ][:4]  # Limit to 4 related courses
+    with span('catalog'):
+        related_courses = [
+            c for c in courses
+            if c['department'] == course['department'] and c['course_code'] != course_code
+        ][:4]  # Limit to 4 related courses
     
-    # Get reviews for this course using Supabase
-    reviews_data = sb.get_reviews_by_course(course_code, approved_only=True)
+    # One query for the course's reviews; the user's own review is among them
+    # even if it hasn't been approved, so it needs no query of its own
+    all_reviews = current_app.extensions['data_store'].reviews_for_course(course_code, approved_only=False)
+    reviews_data = [r for r in all_reviews if r['is_approved']]
     
     # Calculate average ratings
     avg_rating = 0
@@ -239,12 +252,10 @@ def course_detail(course_code):
     # Check if current user has already reviewed this course
     user_review = None
     if current_user.is_authenticated:
-        user_review = Review.query.filter_by(
-            course_code=course_code,
-            user_id=current_user.id
-        ).first()
+        user_review = next((r for r in all_reviews if r['user_id'] == current_user.id), None)
     
-    gpa_stats = get_course_gpa_stats(course_code)
+    with span('gpa'):
+        gpa_stats = get_course_gpa_stats(course_code)
 
     return render_template('course_detail.html',
                          course=course,
@@ -256,6 +267,15 @@ def course_detail(course_code):
                          user_review=user_review,
                          gpa_stats=gpa_stats)
 
+@bp.errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error):
+    flash('Lots of people are signing in right now. Please try again in a moment.', 'error')
+    # The hasher is only used by POST-only forms; send the user back to the page with the form
+    if request.endpoint in ('main.login', 'main.register'):
+        return redirect(url_for(request.endpoint))
+    return redirect(url_for('main.dashboard'))
+
+
 # Authentication routes
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -266,11 +286,14 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        # Use Supabase function to get user
-        user_data = sb.get_user_by_email(form.email.data.lower())
-        if user_data and check_password_hash(user_data['password_hash'], form.password.data):
-            # Load user object for Flask-Login
-            user = User.query.filter_by(email=form.email.data.lower()).first()
+        users = current_app.extensions['users']
+        passwords = current_app.extensions['passwords']
+        user = users.get_by_email(form.email.data)
+        if user and user.is_active is not False and user.has_password and passwords.verify(user.password_hash, form.password.data):
+            if passwords.needs_rehash(user.password_hash):
+                # Hashed at another cost (e.g. Werkzeug's default), upgrade it while we have the password
+                user.password_hash = passwords.hash(form.password.data)
+                users.save(user)
             login_user(user, remember=True)
             next_page = request.args.get('next')
             if not next_page or not next_page.startswith('/'):
@@ -291,27 +314,19 @@ def register():
     
     form = RegisterForm()
     if form.validate_on_submit():
-        # Check if user already exists using Supabase
-        existing_user = sb.get_user_by_email(form.email.data.lower())
-        if existing_user:
-            flash('An account with this email already exists', 'error')
-            return render_template('auth/register.html', form=form)
-        
-        # Create new user in Supabase
-        user_data = sb.create_user(
+        # The unique email index rejects existing accounts, no lookup first
+        user = current_app.extensions['users'].create(
             name=form.name.data,
-            email=form.email.data.lower(),
-            password_hash=generate_password_hash(form.password.data)
+            email=form.email.data,
+            password_hash=current_app.extensions['passwords'].hash(form.password.data)
         )
         
-        if user_data:
-            # Load user object for Flask-Login
-            user = User.query.filter_by(email=form.email.data.lower()).first()
+        if user:
             login_user(user, remember=True)
             flash('Welcome to Course Compass! Your account has been created.', 'success')
             return redirect(url_for('main.index'))
         else:
-            flash('An error occurred while creating your account', 'error')
+            flash('An account with this email already exists', 'error')
     
     return render_template('auth/register.html', form=form)
 
@@ -372,6 +387,11 @@ def google_callback():
         "grant_type": "authorization_code",
     }
 
+    # Only needed for Google sign-in, so not imported with the app
+    import requests
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as google_requests
+
     token_response = requests.post(token_url, data=token_data)
 
     if token_response.status_code != 200:
@@ -427,6 +447,7 @@ def google_callback():
 # Review routes
 @bp.route('/course/<course_code>/review', methods=['GET', 'POST'])
 @login_required
+@live_user_required
 def add_review(course_code):
 
     
@@ -437,8 +458,9 @@ def add_review(course_code):
         flash('Course not found', 'error')
         return redirect(url_for('main.index'))
     
-    # Check if user already reviewed this course using Supabase
-    existing_review = sb.get_user_review_for_course(current_user.id, course_code)
+    # Check if user already reviewed this course
+    store = current_app.extensions['data_store']
+    existing_review = store.user_review(current_user.id, course_code)
     
     if existing_review:
         flash('You have already reviewed this course. You can edit your existing review.', 'info')
@@ -446,8 +468,7 @@ def add_review(course_code):
     
     form = ReviewForm()
     if form.validate_on_submit():
-        # Create review using Supabase
-        review_data = sb.create_review(
+        review_data = store.create_review(
             course_code=course_code,
             user_id=current_user.id,
             rating=int(form.rating.data),
@@ -470,11 +491,12 @@ def add_review(course_code):
 
 @bp.route('/course/<course_code>/review/edit', methods=['GET', 'POST'])
 @login_required
+@live_user_required
 def edit_review(course_code):
 
     
-    # Get review using Supabase
-    review_data = sb.get_user_review_for_course(current_user.id, course_code)
+    store = current_app.extensions['data_store']
+    review_data = store.user_review(current_user.id, course_code)
     
     if not review_data:
         flash('Review not found', 'error')
@@ -493,8 +515,7 @@ def edit_review(course_code):
     form = EditReviewForm(obj=review)
     
     if form.validate_on_submit():
-        # Update review using Supabase
-        success = sb.update_review(
+        success = store.update_review(
             review_id=review_data['id'],
             rating=int(form.rating.data),
             difficulty=int(form.difficulty.data),
@@ -516,13 +537,14 @@ def edit_review(course_code):
 
 @bp.route('/course/<course_code>/review/delete', methods=['POST'])
 @login_required
+@live_user_required
 def delete_review(course_code):
     
-    # Get review using Supabase
-    review_data = sb.get_user_review_for_course(current_user.id, course_code)
+    store = current_app.extensions['data_store']
+    review_data = store.user_review(current_user.id, course_code)
     
     if review_data:
-        success = sb.delete_review(review_data['id'])
+        success = store.delete_review(review_data['id'])
         if success:
             flash('Your review has been deleted', 'info')
         else:
@@ -532,64 +554,20 @@ def delete_review(course_code):
     
     return redirect(url_for('main.course_detail', course_code=course_code))
 
-@bp.route('/api/ai-assistant', methods=['POST'])
-def ai_assistant():
-    """Generate course recommendations using Gemini AI"""
-    
-
-    try:
-
-        client = genai.Client()
-        # Get form data
-        data = request.get_json()
-        major = data.get('major', '')
-        goals = data.get('goals', '')
-        priorities = data.get('priorities', [])
-        
-        if not major or not goals:
-            return jsonify({'error': 'Major and goals are required'}), 400
-        
-        # Configure Gemini
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
-            return jsonify({'error': 'Gemini API key not configured'}), 500
-        
-        model = "gemini-2.5-flash"
-        
-        # Get course data for context
-        courses = _load_courses()
-        
-        # Build course context (limit to relevant departments)
-        course_context = ""
-
-        prompt_get_course_codes = r"""Given the user's major and interests, recommend 3 course codes available at UIUC that would match those interests. Output Format:
-Output ONLY three comma separated course codes in this format:
-AAS,CS,MATH
-DO NOT include any extra text
-"""
-
-        response = client.models.generate_content(model = model, contents = prompt_get_course_codes)
-        course_codes: list[str] = response.text.split(',')
-        courses = list(filter(lambda c: c['department'] in course_codes, courses))
-        if courses:
-            # Sample some courses to provide context
-            sample_courses = courses  # Limit to avoid token limits
-            course_context = "\n".join([
-                f"- {c['course_code']}: {c['course_name']} ({c['credit_hours']} hrs) - {c['gen_ed_requirements']}"
-                for c in sample_courses if c['course_code'] and c['course_name']
-            ])
+def _recommendation_prompt(major: str, goals: str, priorities: List[str]) -> str:
+    """Build the course advisor prompt around locally retrieved candidates"""
+    # Pick candidate courses locally instead of sending whole departments
+    candidates = _course_retriever().top_k(major, goals, priorities, k=AI_CANDIDATE_COURSES)
+    course_context = format_course_context([course for course, _ in candidates])
 
-            
-        
-        # Build the prompt
-        priorities_text = ", ".join(priorities) if priorities else "No specific priorities"
-        user_info = f"""
+    priorities_text = ", ".join(priorities) if priorities else "No specific priorities"
+    user_info = f"""
         Major: {major}
         Goals/Interests: {goals}
         Priorities: {priorities_text}
         """
 
-        prompt = f"""
+    return f"""
         User Information:
         {user_info}
 
@@ -605,6 +583,7 @@ Primary goal:
 Help the student choose Gen-Ed courses that 1) fulfill their remaining Gen-Ed requirements 2) match their personal interests
 
 How to recommend courses:
+-Only recommend courses from the Available Courses list
 -FIRST, focus on Gen-Ed needs
 -Among Gen-Ed courses, choose those that match the student’s interests
 -Avoid recommending courses the student has already taken or is currently taking
@@ -648,12 +627,69 @@ Example Output:
 }
 """
 
-        # Generate response
-        response = client.models.generate_content(model = model, contents = prompt)
-        response = json.loads(response.text)
+
+@lru_cache(maxsize=1)
+def _catalog_version() -> str:
+    """Hash of the catalog CSV, so cached recommendations follow catalog updates"""
+    if not DATA_PATH.exists():
+        return 'empty'
+    return hashlib.sha256(DATA_PATH.read_bytes()).hexdigest()[:16]
+
+
+def _recommendation_key(major: str, goals: str, priorities: List[str]) -> tuple:
+    """Cache key that ignores case, spacing and priority order"""
+    def normalize(text: str) -> str:
+        return ' '.join(text.lower().split())
+    return (normalize(major), normalize(goals), tuple(sorted(set(priorities))), _catalog_version())
+
+
+def _read_assistant_request():
+    """(major, goals, priorities) from the JSON body, or an error response"""
+    data = request.get_json()
+    major = data.get('major', '')
+    goals = data.get('goals', '')
+    priorities = data.get('priorities', [])
+
+    if not major or not goals:
+        return None, (jsonify({'error': 'Major and goals are required'}), 400)
+
+    if not current_app.extensions['ai_backend'].is_configured:
+        return None, (jsonify({'error': 'Gemini API key not configured'}), 500)
+
+    return (major, goals, priorities), None
+
+
+@bp.route('/api/ai-assistant', methods=['POST'])
+def ai_assistant():
+    """Generate course recommendations using Gemini AI"""
+    try:
+        # Get form data
+        fields, error = _read_assistant_request()
+        if error:
+            return error
+        major, goals, priorities = fields
+
+        backend = current_app.extensions['ai_backend']
+
+        # Identical requests share one cached response and one in-flight model call
+        cache = current_app.extensions['ai_cache']
+        key = _recommendation_key(major, goals, priorities)
+        recommendation = cache.get(key)
+        if recommendation is None:
+            def generate():
+                cached = cache.get(key)
+                if cached is not None:
+                    return cached
+                result = json.loads(backend.generate(_recommendation_prompt(major, goals, priorities)))
+                cache.set(key, result)
+                return result
+
+            with span('ai'):
+                recommendation = current_app.extensions['ai_inflight'].do(key, generate)
+
         return jsonify({
             'success': True,
-            'recommendation': response
+            'recommendation': recommendation
         })
         
     except Exception as e:
@@ -662,6 +698,70 @@ Example Output:
             'error': f'Failed to generate recommendation: {str(e)}'
         }), 500
 
+
+@bp.route('/api/ai-assistant/stream', methods=['POST'])
+def ai_assistant_stream():
+    """
+    Stream course recommendations as newline-delimited JSON.
+
+    Each line is {"type": "recommendation", "course": ..., "reason": ...}
+    as soon as the model has written it, then {"type": "done"} or
+    {"type": "error", "error": ...}. The model call runs on the AI executor;
+    the request thread only relays finished recommendations.
+    """
+    try:
+        fields, error = _read_assistant_request()
+        if error:
+            return error
+        major, goals, priorities = fields
+
+        cache = current_app.extensions['ai_cache']
+        key = _recommendation_key(major, goals, priorities)
+        events = queue.Queue()
+
+        cached = cache.get(key)
+        if cached is not None:
+            for item in cached.get('recommended_courses', []):
+                events.put(('recommendation', item))
+            events.put(('done', None))
+        else:
+            prompt = _recommendation_prompt(major, goals, priorities)
+            current_app.extensions['ai_executor'].submit(
+                ai_backend.run_stream,
+                current_app.extensions['ai_backend'],
+                prompt,
+                events,
+                lambda result: cache.set(key, result),
+            )
+    except Exception as e:
+        print(f"Error in AI assistant: {str(e)}")
+        return jsonify({
+            'error': f'Failed to generate recommendation: {str(e)}'
+        }), 500
+
+    timeout = current_app.config['AI_STREAM_TIMEOUT']
+
+    def generate():
+        while True:
+            try:
+                kind, payload = events.get(timeout=timeout)
+            except queue.Empty:
+                yield json.dumps({'type': 'error', 'error': 'Timed out waiting for recommendations'}) + '\n'
+                return
+            if kind == 'recommendation':
+                yield json.dumps({'type': 'recommendation', **payload}) + '\n'
+            elif kind == 'error':
+                yield json.dumps({'type': 'error', 'error': f'Failed to generate recommendation: {payload}'}) + '\n'
+                return
+            else:
+                yield json.dumps({'type': 'done'}) + '\n'
+                return
+
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 @bp.route('/hello')
 def hello():
     return 'Hello, Flask!'
@@ -669,8 +769,10 @@ def hello():
 # Dashboard routes
 @bp.route('/dashboard')
 @login_required
+@live_user_required
 def dashboard():
     from app.forms import PasswordUpdateForm, SetPasswordForm, UsernameUpdateForm, AuditUploadForm, DeleteAccountForm
+    from app.utils.audit_jobs import latest_job
 
     # Get or create user requirements
     requirements = UserRequirements.query.filter_by(user_id=current_user.id).first()
@@ -688,9 +790,11 @@ def dashboard():
     username_form = UsernameUpdateForm(username=current_user.email or current_user.netid)
     audit_form = AuditUploadForm()
     delete_form = DeleteAccountForm()
+    audit_job = latest_job(current_user.id)
 
     return render_template('dashboard/dashboard.html',
                          requirements=requirements,
+                         audit_job=audit_job,
                          password_form=password_form,
                          username_form=username_form,
                          audit_form=audit_form,
@@ -699,31 +803,24 @@ def dashboard():
 
 @bp.route('/upload_audit', methods=['POST'])
 @login_required
+@live_user_required
 def upload_audit():
     from app.forms import AuditUploadForm
-    from app.utils.pdf_parser import DegreeAuditParser
-    from app.models import UserRequirements
-    
+
     form = AuditUploadForm()
-    requirements = UserRequirements.query.filter_by(user_id=current_user.id).first()
-    
+
     if form.validate_on_submit():
         try:
-            # Parse the PDF
-            parser = DegreeAuditParser(form.audit_file.data)
-            parsed_requirements = parser.parse_requirements()
-            
-            # Update user requirements
-            for key, value in parsed_requirements.items():
-                if hasattr(requirements, key):
-                    setattr(requirements, key, value)
-            
-            requirements.audit_uploaded = True
-            requirements.last_updated = datetime.utcnow()
-            db.session.commit()
-            
-            flash('Degree audit uploaded and parsed successfully!', 'success')
+            # Parsing happens in the background; the dashboard polls the job
+            job = current_app.extensions['audit_jobs'].submit(current_user.id, form.audit_file.data.read())
+            if job.status == 'done':
+                flash('Degree audit uploaded and parsed successfully!', 'success')
+            elif job.status == 'failed':
+                flash(f'Error processing PDF: {job.error}', 'error')
+            else:
+                flash('Degree audit uploaded! Your requirements will update once it has been read.', 'info')
         except Exception as e:
+            db.session.rollback()
             flash(f'Error processing PDF: {str(e)}', 'error')
     else:
         for field, errors in form.errors.items():
@@ -732,8 +829,18 @@ def upload_audit():
     
     return redirect(url_for('main.dashboard'))
 
+@bp.route('/api/audit-status')
+@login_required
+def audit_status():
+    """Status of the user's latest degree audit upload"""
+    from app.utils.audit_jobs import latest_job
+
+    job = latest_job(current_user.id)
+    return jsonify({'job': job.to_dict() if job else None})
+
 @bp.route('/update_username', methods=['POST'])
 @login_required
+@live_user_required
 def update_username():
     """Update user's username"""
     from app.forms import UsernameUpdateForm
@@ -744,8 +851,10 @@ def update_username():
         new_username = form.username.data.strip()
 
         # Update username
-        current_user.email = new_username
-        db.session.commit()
+        users = current_app.extensions['users']
+        user = users.get(current_user.id)
+        user.email = new_username
+        users.save(user)
         flash('Your username has been updated successfully!', 'success')
     else:
         for field, errors in form.errors.items():
@@ -757,6 +866,7 @@ def update_username():
 
 @bp.route('/set_password', methods=['POST'])
 @login_required
+@live_user_required
 def set_password():
     """Set password for OAuth users who don't have one yet"""
     from app.forms import SetPasswordForm
@@ -765,8 +875,10 @@ def set_password():
 
     if form.validate_on_submit():
         # Set password
-        current_user.password_hash = generate_password_hash(form.new_password.data)
-        db.session.commit()
+        users = current_app.extensions['users']
+        user = users.get(current_user.id)
+        user.password_hash = current_app.extensions['passwords'].hash(form.new_password.data)
+        users.save(user)
         flash('Your password has been set successfully! You can now login with your username and password.', 'success')
     else:
         for field, errors in form.errors.items():
@@ -778,6 +890,7 @@ def set_password():
 
 @bp.route('/update_password', methods=['POST'])
 @login_required
+@live_user_required
 def update_password():
     """Change password for users who already have one"""
     from app.forms import PasswordUpdateForm
@@ -786,10 +899,14 @@ def update_password():
 
     if form.validate_on_submit():
         # Verify current password
-        if current_user.has_password and check_password_hash(current_user.password_hash, form.current_password.data):
+        passwords = current_app.extensions['passwords']
+        users = current_app.extensions['users']
+        user = users.get(current_user.id)
+        # The hash is read from the row, not the cached current_user
+        if user.has_password and passwords.verify(user.password_hash, form.current_password.data):
             # Update password
-            current_user.password_hash = generate_password_hash(form.new_password.data)
-            db.session.commit()
+            user.password_hash = passwords.hash(form.new_password.data)
+            users.save(user)
             flash('Your password has been updated successfully!', 'success')
         else:
             flash('Current password is incorrect', 'error')
@@ -803,31 +920,19 @@ def update_password():
 
 @bp.route('/delete_account', methods=['POST'])
 @login_required
+@live_user_required
 def delete_account():
     """Delete user account and all associated data"""
     try:
         user_id = current_user.id
 
-        # Delete all user's reviews
-        Review.query.filter_by(user_id=user_id).delete()
-
-        # Delete all user's messages
-        Message.query.filter_by(user_id=user_id).delete()
-
-        # Delete user requirements
-        UserRequirements.query.filter_by(user_id=user_id).delete()
+        # Deactivates the account now; reviews, messages, requirements, audit
+        # uploads and the account itself are deleted in the background
+        current_app.extensions['account_deletions'].request_deletion(user_id)
 
         # Log out user before deleting account
         logout_user()
-
-        # Delete the user account
-        user = User.query.get(user_id)
-        if user:
-            db.session.delete(user)
-            db.session.commit()
-            flash('Your account has been permanently deleted. We\'re sad to see you go!', 'info')
-        else:
-            flash('Account deletion failed. Please try again.', 'error')
+        flash('Your account has been permanently deleted. We\'re sad to see you go!', 'info')
 
     except Exception as e:
         db.session.rollback()
@@ -843,11 +948,9 @@ def delete_account():
 def get_messages(course_code):
     """Get messages for a specific course"""
     try:
-        # Get messages using Supabase
-        messages_data = sb.get_messages_by_course(course_code, limit=100)
+        messages_data = current_app.extensions['data_store'].messages_for_course(course_code, limit=100)
         
         # Format response with time_ago calculation
-        from app.models import Message
         messages_formatted = []
         for msg in messages_data:
             # Calculate time_ago
@@ -888,6 +991,7 @@ def get_messages(course_code):
 
 @bp.route('/api/messages/<course_code>', methods=['POST'])
 @login_required
+@live_user_required
 def send_message(course_code):
     """Send a message to a course chat"""
     try:
@@ -906,8 +1010,7 @@ def send_message(course_code):
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        # Create message using Supabase
-        message_data = sb.create_message(course_code, current_user.id, content)
+        message_data = current_app.extensions['data_store'].create_message(course_code, current_user.id, content)
         
         if message_data:
             return jsonify({
@@ -928,19 +1031,20 @@ def send_message(course_code):
 
 @bp.route('/api/messages/<int:message_id>', methods=['DELETE'])
 @login_required
+@live_user_required
 def delete_message(message_id):
     """Delete own message"""
     try:
-        message = Message.query.get_or_404(message_id)
-        
-        # Only allow user to delete their own messages
-        if message.user_id != current_user.id:
-            return jsonify({'error': 'Unauthorized'}), 403
+        store = current_app.extensions['data_store']
         
-        message.is_deleted = True
-        db.session.commit()
+        # Only allow user to delete their own messages (one update, scoped to the user)
+        if store.delete_own_message(message_id, current_user.id):
+            return jsonify({'success': True})
         
-        return jsonify({'success': True})
+        # Nothing deleted: say whether the message is missing or someone else's
+        if store.get_message(message_id) is None:
+            return jsonify({'error': 'Message not found'}), 404
+        return jsonify({'error': 'Unauthorized'}), 403
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
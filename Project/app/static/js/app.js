@@ -435,9 +435,18 @@ document.addEventListener("DOMContentLoaded", () => {
       aiOutput.classList.add("active");
       aiOutput.scrollIntoView({ behavior: "smooth", block: "start" });
 
+      const renderRecommendation = (course) => `
+              <a href="/course/${encodeURIComponent(
+                course.course
+              )}" class="course-recommendation-card">
+                <div class="course-code">${course.course}</div>
+                <div class="course-reason">${course.reason}</div>
+              </a>
+            `;
+
       try {
-        // Call the AI endpoint
-        const response = await fetch("/api/ai-assistant", {
+        // Call the streaming AI endpoint (newline-delimited JSON)
+        const response = await fetch("/api/ai-assistant/stream", {
           method: "POST",
           headers: {
             "Content-Type": "application/json",
@@ -456,56 +465,54 @@ document.addEventListener("DOMContentLoaded", () => {
           );
         }
 
-        const data = await response.json();
-
-        // Parse JSON response
-        let recommendationHTML = "";
-        try {
-          const jsonResponse =
-            typeof data.recommendation === "string"
-              ? JSON.parse(data.recommendation)
-              : data.recommendation;
-
-          if (
-            jsonResponse.recommended_courses &&
-            Array.isArray(jsonResponse.recommended_courses)
-          ) {
-            recommendationHTML = jsonResponse.recommended_courses
-              .map(
-                (course) => `
-              <a href="/course/${encodeURIComponent(
-                course.course
-              )}" class="course-recommendation-card">
-                <div class="course-code">${course.course}</div>
-                <div class="course-reason">${course.reason}</div>
-              </a>
-            `
-              )
-              .join("");
-          } else {
-            // Fallback if JSON doesn't match expected structure
-            recommendationHTML = `<p>${
-              typeof data.recommendation === "string"
-                ? data.recommendation
-                : JSON.stringify(data.recommendation)
-            }</p>`;
-          }
-        } catch (parseError) {
-          // If JSON parsing fails, display as plain text
-          console.error("Failed to parse JSON response:", parseError);
-          recommendationHTML = `<p>${data.recommendation}</p>`;
-        }
-
-        // Display the AI response
+        // Show each recommendation as soon as it arrives
         aiOutput.innerHTML = `
           <h3>Your Personalized Course Recommendations</h3>
-          <div class="ai-recommendation">
-            ${recommendationHTML}
+          <div class="ai-recommendation"></div>
+          <div class="ai-loading">
+            <div class="loading-spinner"></div>
+            <p>Finding more courses...</p>
           </div>
           <button type="button" class="btn btn-ghost" onclick="this.parentElement.classList.remove('active')">
             Close
           </button>
         `;
+        const recommendationList = aiOutput.querySelector(".ai-recommendation");
+        const pending = aiOutput.querySelector(".ai-loading");
+        let received = 0;
+
+        const handleEvent = (line) => {
+          if (!line.trim()) return;
+          const event = JSON.parse(line);
+          if (event.type === "recommendation") {
+            recommendationList.insertAdjacentHTML(
+              "beforeend",
+              renderRecommendation(event)
+            );
+            received += 1;
+          } else if (event.type === "error") {
+            throw new Error(event.error);
+          }
+        };
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = "";
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+          const lines = buffered.split("\n");
+          buffered = lines.pop();
+          lines.forEach(handleEvent);
+        }
+        handleEvent(buffered);
+
+        pending.remove();
+        if (received === 0) {
+          recommendationList.innerHTML =
+            "<p>No recommendations this time. Try describing your goals in a bit more detail.</p>";
+        }
       } catch (error) {
         console.error("AI assistant error:", error);
         aiOutput.innerHTML = `
@@ -1,14 +1,45 @@
 import os
-from supabase import create_client, Client
+import threading
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url=url, supabase_key=key)
+
+# A SQLite file (or :memory:) to use instead of Supabase, through the local
+# stand-in in app/utils/local_supabase.py; for benchmarks and load tests
+local_db: Optional[str] = os.environ.get("SUPABASE_LOCAL_DB")
+local_latency_ms: float = float(os.environ.get("SUPABASE_LOCAL_LATENCY_MS", 0))
+
+_client: Optional["Client"] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> "Client":
+    """The Supabase client, created on first use (the SDK is slow to import)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if local_db:
+                    from app.utils.local_supabase import LocalClient
+                    _client = LocalClient(local_db, latency=local_latency_ms / 1000)
+                else:
+                    from supabase import create_client
+                    _client = create_client(supabase_url=url, supabase_key=key)
+    return _client
+
+def set_client(client) -> None:
+    """Use this client from now on (e.g. a LocalClient in a benchmark)"""
+    global _client
+    with _client_lock:
+        _client = client
 
 # ============================================================================
 # USER FUNCTIONS
@@ -17,7 +48,7 @@ supabase: Client = create_client(supabase_url=url, supabase_key=key)
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """Get user by email address."""
     try:
-        response = supabase.table('user').select('*').eq('email', email).execute()
+        response = get_client().table('user').select('*').eq('email', email).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -28,7 +59,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user by ID."""
     try:
-        response = supabase.table('user').select('*').eq('id', user_id).execute()
+        response = get_client().table('user').select('*').eq('id', user_id).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -46,7 +77,7 @@ def create_user(name: str, email: str, password_hash: str) -> Optional[Dict[str,
             'created_at': datetime.utcnow().isoformat(),
             'is_active': True
         }
-        response = supabase.table('user').insert(data).execute()
+        response = get_client().table('user').insert(data).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -57,7 +88,7 @@ def create_user(name: str, email: str, password_hash: str) -> Optional[Dict[str,
 def update_user_password(user_id: int, new_password_hash: str) -> bool:
     """Update user's password."""
     try:
-        response = supabase.table('user').update({
+        response = get_client().table('user').update({
             'password_hash': new_password_hash
         }).eq('id', user_id).execute()
         return response.data is not None
@@ -72,7 +103,7 @@ def update_user_password(user_id: int, new_password_hash: str) -> bool:
 def get_reviews_by_course(course_code: str, approved_only: bool = True) -> List[Dict[str, Any]]:
     """Get all reviews for a specific course."""
     try:
-        query = supabase.table('review').select('*, author:user_id(id, name, email)').eq('course_code', course_code)
+        query = get_client().table('review').select('*, author:user_id(id, name, email)').eq('course_code', course_code)
         
         if approved_only:
             query = query.eq('is_approved', True)
@@ -86,7 +117,7 @@ def get_reviews_by_course(course_code: str, approved_only: bool = True) -> List[
 def get_user_review_for_course(user_id: int, course_code: str) -> Optional[Dict[str, Any]]:
     """Get a user's review for a specific course."""
     try:
-        response = supabase.table('review').select('*').eq('user_id', user_id).eq('course_code', course_code).execute()
+        response = get_client().table('review').select('*').eq('user_id', user_id).eq('course_code', course_code).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -115,7 +146,7 @@ def create_review(course_code: str, user_id: int, rating: int, difficulty: int,
             'is_approved': True,
             'is_flagged': False
         }
-        response = supabase.table('review').insert(data).execute()
+        response = get_client().table('review').insert(data).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -139,7 +170,7 @@ def update_review(review_id: int, rating: int, difficulty: int, workload: int,
             'grade_received': grade_received,
             'updated_at': datetime.utcnow().isoformat()
         }
-        response = supabase.table('review').update(data).eq('id', review_id).execute()
+        response = get_client().table('review').update(data).eq('id', review_id).execute()
         return response.data is not None
     except Exception as e:
         print(f"Error updating review: {e}")
@@ -148,7 +179,7 @@ def update_review(review_id: int, rating: int, difficulty: int, workload: int,
 def delete_review(review_id: int) -> bool:
     """Delete a review."""
     try:
-        response = supabase.table('review').delete().eq('id', review_id).execute()
+        response = get_client().table('review').delete().eq('id', review_id).execute()
         return response.data is not None
     except Exception as e:
         print(f"Error deleting review: {e}")
@@ -161,7 +192,7 @@ def delete_review(review_id: int) -> bool:
 def get_messages_by_course(course_code: str, limit: int = 100) -> List[Dict[str, Any]]:
     """Get messages for a specific course."""
     try:
-        response = supabase.table('message').select('*, author:user_id(id, name, email)').eq(
+        response = get_client().table('message').select('*, author:user_id(id, name, email)').eq(
             'course_code', course_code
         ).eq('is_deleted', False).order('created_at', desc=True).limit(limit).execute()
         
@@ -184,11 +215,11 @@ def create_message(course_code: str, user_id: int, content: str) -> Optional[Dic
             'is_flagged': False,
             'is_deleted': False
         }
-        response = supabase.table('message').insert(data).execute()
+        response = get_client().table('message').insert(data).execute()
         if response.data and len(response.data) > 0:
             # Get the message with author info
             message_id = response.data[0]['id']
-            full_message = supabase.table('message').select('*, author:user_id(id, name, email)').eq('id', message_id).execute()
+            full_message = get_client().table('message').select('*, author:user_id(id, name, email)').eq('id', message_id).execute()
             if full_message.data and len(full_message.data) > 0:
                 return full_message.data[0]
         return None
@@ -196,12 +227,16 @@ def create_message(course_code: str, user_id: int, content: str) -> Optional[Dic
         print(f"Error creating message: {e}")
         return None
 
-def soft_delete_message(message_id: int) -> bool:
-    """Soft delete a message (mark as deleted)."""
+def soft_delete_message(message_id: int, user_id: Optional[int] = None) -> bool:
+    """Soft delete a message (mark as deleted). With user_id, only if it's that user's message."""
     try:
-        response = supabase.table('message').update({
+        query = get_client().table('message').update({
             'is_deleted': True
-        }).eq('id', message_id).execute()
+        }).eq('id', message_id)
+        if user_id is not None:
+            # The updated rows come back, so an empty result means not theirs (or no such message)
+            return bool(query.eq('user_id', user_id).execute().data)
+        response = query.execute()
         return response.data is not None
     except Exception as e:
         print(f"Error deleting message: {e}")
@@ -210,7 +245,7 @@ def soft_delete_message(message_id: int) -> bool:
 def get_message_by_id(message_id: int) -> Optional[Dict[str, Any]]:
     """Get a single message by ID."""
     try:
-        response = supabase.table('message').select('*').eq('id', message_id).execute()
+        response = get_client().table('message').select('*').eq('id', message_id).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -225,7 +260,7 @@ def get_message_by_id(message_id: int) -> Optional[Dict[str, Any]]:
 def get_user_requirements(user_id: int) -> Optional[Dict[str, Any]]:
     """Get user requirements/gen-ed progress."""
     try:
-        response = supabase.table('user_requirements').select('*').eq('user_id', user_id).execute()
+        response = get_client().table('user_requirements').select('*').eq('user_id', user_id).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -258,7 +293,7 @@ def create_user_requirements(user_id: int) -> Optional[Dict[str, Any]]:
             'audit_uploaded': False,
             'last_updated': datetime.utcnow().isoformat()
         }
-        response = supabase.table('user_requirements').insert(data).execute()
+        response = get_client().table('user_requirements').insert(data).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]
         return None
@@ -270,16 +305,44 @@ def update_user_requirements(user_id: int, updates: Dict[str, Any]) -> bool:
     """Update user requirements."""
     try:
         updates['last_updated'] = datetime.utcnow().isoformat()
-        response = supabase.table('user_requirements').update(updates).eq('user_id', user_id).execute()
+        response = get_client().table('user_requirements').update(updates).eq('user_id', user_id).execute()
         return response.data is not None
     except Exception as e:
         print(f"Error updating user requirements: {e}")
         return False
     
+def delete_user_rows(table: str, user_id: int, batch_size: int = 500) -> Optional[int]:
+    """Delete a user's rows from a table, batch_size ids per request. Returns how many, None on error."""
+    try:
+        deleted = 0
+        while True:
+            response = get_client().table(table).select('id').eq('user_id', user_id).limit(batch_size).execute()
+            ids = [row['id'] for row in response.data or []]
+            if not ids:
+                return deleted
+            response = get_client().table(table).delete().in_('id', ids).execute()
+            if not response.data:
+                # Blocked (e.g. by a row-level security policy); selecting again would find the same rows
+                print(f"Error deleting {table} rows for user {user_id}: {len(ids)} rows were not deleted")
+                return None
+            deleted += len(response.data)
+    except Exception as e:
+        print(f"Error deleting {table} rows for user {user_id}: {e}")
+        return None
+
+def delete_user(user_id: int) -> bool:
+    """Delete a user row."""
+    try:
+        response = get_client().table('user').delete().eq('id', user_id).execute()
+        return response.data is not None
+    except Exception as e:
+        print(f"Error deleting user: {e}")
+        return False
+
 def get_all_users() -> List[Dict[str, Any]]:
     """Get all users (for admin purposes)."""
     try:
-        response = supabase.table('user').select('*').execute()
+        response = get_client().table('user').select('*').execute()
         return response.data if response.data else []
     except Exception as e:
         print(f"Error getting all users: {e}")
@@ -0,0 +1,104 @@
+"""
+Deleting an account and everything it owns, in both data stores.
+
+Reviews and messages may live in Supabase (DATA_STORE=supabase, see
+data_store.py), so its tables are cleared as well as the app database's.
+Rows are deleted in batches of ACCOUNT_DELETE_BATCH ids per statement rather
+than one by one or all at once, so a long-time user's thousands of chat
+messages don't become one huge statement. The order makes an interrupted deletion safe to run
+again:
+
+    1. the account is deactivated, so it can't log in or stay logged in
+    2. Supabase (if it's the data store): the user's reviews, messages and
+       requirements
+    3. app database, in one transaction: the same tables, audit jobs (and
+       their uploaded files), then the user
+    4. Supabase (if it's the data store): the user row, if it's there
+
+delete_account() only does step 1 in the request; the rest runs on a
+background thread (ACCOUNT_DELETE_QUEUE=inline runs it in the request, for
+tests).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from flask import current_app
+
+from app import super as sb
+from app.models import AuditJob, Message, Review, UserRequirements, db
+
+# Supabase tables holding a user's rows (the user row itself goes last)
+REMOTE_TABLES = ('review', 'message', 'user_requirements')
+LOCAL_MODELS = (Review, Message, UserRequirements, AuditJob)
+
+
+def delete_local_rows(model, user_id: int, batch_size: int) -> int:
+    """Delete a user's rows of one model, batch_size ids per statement (not committed)"""
+    deleted = 0
+    while True:
+        ids = [row.id for row in db.session.query(model.id).filter_by(user_id=user_id).limit(batch_size)]
+        if not ids:
+            return deleted
+        if model is AuditJob:
+            for job in AuditJob.query.filter(AuditJob.id.in_(ids), AuditJob.file_path.isnot(None)):
+                if os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+        db.session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        deleted += len(ids)
+
+
+class AccountDeleter:
+    def __init__(self, app):
+        self.app = app
+        self.batch_size = app.config['ACCOUNT_DELETE_BATCH']
+        self.inline = app.config['ACCOUNT_DELETE_QUEUE'] == 'inline'
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='account-delete')
+
+    def request_deletion(self, user_id: int) -> None:
+        """Deactivate the account now and delete its data in the background"""
+        users = current_app.extensions['users']
+        user = users.get(user_id)
+        if user is None:
+            return
+        user.is_active = False
+        users.save(user)
+        if self.inline:
+            self.delete(user_id)
+        else:
+            self._executor.submit(self._run, user_id)
+
+    def _run(self, user_id: int) -> None:
+        with self.app.app_context():
+            try:
+                self.delete(user_id)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error deleting account {user_id}: {str(e)}")
+
+    def delete(self, user_id: int) -> Dict[str, int]:
+        """Delete the user and their data from both stores; returns rows deleted per table"""
+        counts: Dict[str, int] = {}
+        remote = current_app.extensions['data_store'].is_remote
+        for table in REMOTE_TABLES if remote else ():
+            deleted = sb.delete_user_rows(table, user_id, self.batch_size)
+            if deleted is None:
+                # Leave the (deactivated) account so the deletion can be retried
+                raise RuntimeError(f"Could not delete {table} rows from Supabase")
+            counts[f'remote_{table}'] = deleted
+
+        for model in LOCAL_MODELS:
+            counts[model.__tablename__] = delete_local_rows(model, user_id, self.batch_size)
+        users = current_app.extensions['users']
+        user = users.get(user_id)
+        if user is not None:
+            users.delete(user)
+        db.session.commit()
+
+        if remote and not sb.delete_user(user_id):
+            print(f"Account {user_id} deleted, but its Supabase user row wasn't")
+        return counts
+
+
+def init_app(app) -> None:
+    app.extensions['account_deletions'] = AccountDeleter(app)
@@ -0,0 +1,200 @@
+"""
+Model backends for the AI assistant.
+
+The configured backend lives on the app (app.extensions['ai_backend']) so
+one Gemini client is reused across requests. AI_BACKEND=fake swaps in a
+deterministic backend for tests and load testing that never leaves the
+process.
+"""
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
+
+from app.utils.response_cache import SingleFlight, TTLCache
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+_COURSE_LINE = re.compile(r'^\s*- ([A-Z]{2,5} \d{3}): ([^(\n]+)', re.MULTILINE)
+
+
+class GeminiBackend:
+    name = 'gemini'
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(os.environ.get('GEMINI_API_KEY'))
+
+    @property
+    def client(self):
+        """The shared genai client, created on first use"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # Imported here: google.genai takes most of a second to import
+                    from google import genai
+                    self._client = genai.Client()
+        return self._client
+
+    def generate(self, prompt: str) -> str:
+        response = self.client.models.generate_content(model=self.model, contents=prompt)
+        return response.text
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.client.models.generate_content_stream(model=self.model, contents=prompt):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Recommends the first courses listed in the prompt's course context.
+
+    Counts its calls and can sleep to stand in for model latency.
+    """
+
+    name = 'fake'
+    is_configured = True
+
+    def __init__(self, delay: float = 0.0, count: int = 3):
+        self.delay = delay
+        self.count = count
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def recommendations(self, prompt: str) -> List[dict]:
+        return [
+            {'course': code, 'reason': f"Matches your interests: {name.strip()}"}
+            for code, name in _COURSE_LINE.findall(prompt)[:self.count]
+        ]
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return json.dumps({'recommended_courses': self.recommendations(prompt)})
+
+    def generate_stream(self, prompt: str, chunk_size: int = 24) -> Iterator[str]:
+        with self._lock:
+            self.calls += 1
+        text = json.dumps({'recommended_courses': self.recommendations(prompt)}, indent=2)
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        for chunk in chunks:
+            if self.delay:
+                time.sleep(self.delay / len(chunks))
+            yield chunk
+
+
+class RecommendationStream:
+    """
+    Pulls complete recommendation objects out of partial model output.
+
+    The model answers with {"recommended_courses": [{...}, {...}]}, so every
+    object that opens and closes one level below the outer object is a
+    recommendation. Braces inside strings are ignored, as is anything
+    outside the outer object (such as a stray markdown fence).
+    """
+
+    def __init__(self):
+        self.items: List[dict] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._current: List[str] = []
+        # The outer object has been closed, i.e. the output wasn't cut short
+        self.closed = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        """Consume the next piece of output, returning recommendations it completed"""
+        completed = []
+        for char in chunk:
+            if self._depth >= 2:
+                self._current.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self._depth:
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+                if self._depth == 2:
+                    self._current = [char]
+            elif char == '}' and self._depth:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.closed = True
+                elif self._depth == 1:
+                    item = self._parse(''.join(self._current))
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+        return completed
+
+    @staticmethod
+    def _parse(text: str) -> Optional[dict]:
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return None
+        if isinstance(item, dict) and item.get('course'):
+            return item
+        return None
+
+    def result(self) -> dict:
+        return {'recommended_courses': self.items}
+
+
+def run_stream(backend, prompt: str, events: queue.Queue, on_complete: Callable[[dict], None]) -> None:
+    """
+    Worker body for a streamed recommendation.
+
+    Runs on the AI executor, not the request thread. Each recommendation is
+    put on events as soon as the model finishes writing it, followed by
+    ('done', None) or ('error', message). on_complete gets the full result,
+    even if the client has gone away in the meantime, but only when the
+    output was complete and had at least one recommendation, so an empty or
+    cut-off answer is never cached.
+    """
+    stream = RecommendationStream()
+    try:
+        for chunk in backend.generate_stream(prompt):
+            for item in stream.feed(chunk):
+                events.put(('recommendation', item))
+        if stream.closed and stream.items:
+            on_complete(stream.result())
+        events.put(('done', None))
+    except Exception as e:
+        print(f"Error in AI assistant stream: {str(e)}")
+        events.put(('error', str(e)))
+
+
+def create_backend(name: str, model: str = DEFAULT_MODEL):
+    if name == 'fake':
+        return FakeBackend(delay=float(os.environ.get('AI_FAKE_DELAY', 0)))
+    if name == 'gemini':
+        return GeminiBackend(model)
+    raise ValueError(f"Unknown AI backend: {name}")
+
+
+def init_app(app) -> None:
+    """Attach the model backend, response cache, in-flight registry and stream workers"""
+    app.extensions['ai_backend'] = create_backend(app.config['AI_BACKEND'], app.config['AI_MODEL'])
+    app.extensions['ai_cache'] = TTLCache(maxsize=app.config['AI_CACHE_SIZE'], ttl=app.config['AI_CACHE_TTL'])
+    app.extensions['ai_inflight'] = SingleFlight()
+    app.extensions['ai_executor'] = ThreadPoolExecutor(
+        max_workers=app.config['AI_STREAM_WORKERS'], thread_name_prefix='ai-stream'
+    )
@@ -0,0 +1,79 @@
+"""
+On-disk cache of parsed degree audits, keyed by the SHA-256 of the PDF.
+
+Students upload the same audit again and again (and the parse only depends
+on the file), so a hit skips text extraction entirely. Each entry is a small
+JSON file; the directory is bounded to max_entries and the least recently
+used entries are evicted first (a hit touches the file's mtime). Entries live
+under a PARSER_VERSION subdirectory so parser changes start a fresh cache.
+"""
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+
+from app.utils.pdf_parser import PARSER_VERSION
+
+
+class AuditCache:
+    def __init__(self, directory: str, max_entries: int = 1000):
+        self.directory = os.path.join(directory, f"v{PARSER_VERSION}")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._count = sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+
+    def _path(self, file_hash: str) -> str:
+        return os.path.join(self.directory, f"{file_hash}.json")
+
+    def get(self, file_hash: str) -> Optional[Dict[str, bool]]:
+        path = self._path(file_hash)
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                result = json.load(handle)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def set(self, file_hash: str, result: Dict[str, bool]) -> None:
+        path = self._path(file_hash)
+        is_new = not os.path.exists(path)
+        # Write then rename, so readers in other processes never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(result, handle)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries down to 90% of max_entries"""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith('.json'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        entries.sort()
+        keep = int(self.max_entries * 0.9)
+        for _, path in entries[:max(0, len(entries) - keep)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._count = min(len(entries), keep)
+
+    def __len__(self) -> int:
+        return self._count
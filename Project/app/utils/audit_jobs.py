@@ -0,0 +1,208 @@
+"""
+Background parsing of degree audit uploads.
+
+An upload is written to AUDIT_UPLOAD_DIR and recorded as an AuditJob row, so
+the job store is the app database (SQLite locally). Each job is parsed by
+one process pool worker, away from the web workers, reading pages lazily
+and stopping once every requirement is decided. Spreading one audit's pages
+over the pool (AUDIT_PAGE_BATCH pages per task) was slower than that at
+every size measured, so it is only used for audits of at least
+AUDIT_PARALLEL_PAGES pages, and not at all by default (0). The result is
+applied to the user's UserRequirements when the job finishes. Failed parses are retried
+up to AUDIT_MAX_ATTEMPTS times. Results are also kept in an AuditCache, so a
+file anyone has uploaded before is never parsed again. AUDIT_QUEUE=inline
+runs jobs in the submitting thread instead, for tests and debugging.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from flask import has_app_context
+
+from app.models import AuditJob, UserRequirements, db
+from app.utils.audit_cache import AuditCache
+from app.utils.pdf_parser import DegreeAuditParser, count_pages
+
+
+def parse_audit_file(path: str) -> Dict[str, bool]:
+    """Parse one stored upload in this process (AUDIT_QUEUE=inline)"""
+    with open(path, 'rb') as handle:
+        return DegreeAuditParser(handle).parse_requirements()
+
+
+def apply_requirements(user_id: int, parsed: Dict[str, bool]) -> None:
+    """Copy parsed requirements onto the user's UserRequirements (not committed)"""
+    requirements = UserRequirements.query.filter_by(user_id=user_id).first()
+    if requirements is None:
+        requirements = UserRequirements(user_id=user_id)
+        db.session.add(requirements)
+    for key, value in parsed.items():
+        if hasattr(requirements, key):
+            setattr(requirements, key, value)
+    requirements.audit_uploaded = True
+    requirements.last_updated = datetime.utcnow()
+
+
+def latest_job(user_id: int) -> Optional[AuditJob]:
+    return AuditJob.query.filter_by(user_id=user_id).order_by(AuditJob.id.desc()).first()
+
+
+class AuditJobQueue:
+    def __init__(self, app):
+        self.app = app
+        self.upload_dir = app.config['AUDIT_UPLOAD_DIR']
+        self.max_attempts = app.config['AUDIT_MAX_ATTEMPTS']
+        self.inline = app.config['AUDIT_QUEUE'] == 'inline'
+        # A pending job nobody here is running (e.g. after a restart) is
+        # picked up again by the next identical upload once it's this old
+        self.stale_after = timedelta(seconds=app.config['AUDIT_JOB_TIMEOUT'])
+        self.cache = AuditCache(app.config['AUDIT_CACHE_DIR'], app.config['AUDIT_CACHE_SIZE'])
+        self.page_batch = app.config['AUDIT_PAGE_BATCH']
+        self.parallel_pages = app.config['AUDIT_PARALLEL_PAGES']
+        self._workers = app.config['AUDIT_WORKERS']
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._coordinator = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix='audit-job')
+        self._running: Dict[int, Future] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """The worker pool, started on the first upload rather than at app creation"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Spawned, not forked: the web process has threads of its own
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self._workers, mp_context=multiprocessing.get_context('spawn')
+                    )
+        return self._executor
+
+    def submit(self, user_id: int, data: bytes) -> AuditJob:
+        """
+        Queue an uploaded audit for parsing and return its job.
+
+        A file already in the cache (uploaded before by anyone, with the
+        current parser) is applied straight away and its job is done on
+        creation. Uploading a file that is still being parsed returns the
+        pending job.
+        """
+        file_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            job = (AuditJob.query
+                   .filter_by(user_id=user_id, file_hash=file_hash)
+                   .filter(AuditJob.status != 'failed')
+                   .order_by(AuditJob.id.desc())
+                   .first())
+
+            if job is not None and job.is_pending and (
+                job.id in self._running or job.updated_at > datetime.utcnow() - self.stale_after
+            ):
+                return job
+
+            cached = self.cache.get(file_hash)
+            if cached is not None:
+                if job is None:
+                    job = AuditJob(user_id=user_id, file_hash=file_hash)
+                    db.session.add(job)
+                apply_requirements(user_id, cached)
+                job.status = 'done'
+                job.result = json.dumps(cached)
+                job.file_path = None
+                db.session.commit()
+                return job
+
+            path = os.path.join(self.upload_dir, f"{file_hash}-{user_id}.pdf")
+            if not os.path.exists(path):
+                with open(path, 'wb') as handle:
+                    handle.write(data)
+            if job is None:
+                job = AuditJob(user_id=user_id, file_hash=file_hash)
+                db.session.add(job)
+            elif job.status == 'done':
+                # Parsed by an older parser version (or evicted); parse again
+                job.attempts = 0
+            job.file_path = path
+            db.session.commit()
+
+            self._dispatch(job)
+        if self.inline:
+            db.session.refresh(job)
+        return job
+
+    def _dispatch(self, job: AuditJob) -> None:
+        job.status = 'running'
+        job.attempts += 1
+        db.session.commit()
+        job_id, path = job.id, job.file_path
+
+        if self.inline:
+            future: Future = Future()
+            try:
+                future.set_result(parse_audit_file(path))
+            except Exception as e:
+                future.set_exception(e)
+            self._finish(job_id, future)
+            return
+
+        future = self._coordinator.submit(self._parse, path)
+        self._running[job_id] = future
+        future.add_done_callback(lambda done: self._finish(job_id, done))
+
+    def _parse(self, path: str) -> Dict[str, bool]:
+        """Coordinator body: parse the upload on the process pool"""
+        if self.parallel_pages and count_pages(path) >= self.parallel_pages:
+            return DegreeAuditParser(path).parse_requirements(
+                executor=self.executor, batch_size=self.page_batch, window=self._workers
+            )
+        return self.executor.submit(parse_audit_file, path).result()
+
+    def _finish(self, job_id: int, future: Future) -> None:
+        """Record a job's outcome; runs on the job's coordinator thread"""
+        context = nullcontext() if has_app_context() else self.app.app_context()
+        with context, self._lock:
+            try:
+                job = db.session.get(AuditJob, job_id)
+                error = future.exception()
+                if error is None:
+                    parsed = future.result()
+                    apply_requirements(job.user_id, parsed)
+                    job.status = 'done'
+                    job.result = json.dumps(parsed)
+                    job.error = None
+                    self.cache.set(job.file_hash, parsed)
+                elif job.attempts < self.max_attempts:
+                    print(f"Audit job {job_id} failed (attempt {job.attempts}), retrying: {error}")
+                    job.error = str(error)
+                    if isinstance(error, BrokenProcessPool):
+                        # A worker died; the pool can't be used again
+                        self._executor = None
+                    self._dispatch(job)
+                    return
+                else:
+                    print(f"Audit job {job_id} failed: {error}")
+                    job.status = 'failed'
+                    job.error = str(error)
+
+                if job.file_path and os.path.exists(job.file_path):
+                    os.remove(job.file_path)
+                job.file_path = None
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error finishing audit job {job_id}: {str(e)}")
+            finally:
+                if self._running.get(job_id) is future:
+                    del self._running[job_id]
+
+
+def init_app(app) -> None:
+    """Create the upload directory and attach the job queue"""
+    os.makedirs(app.config['AUDIT_UPLOAD_DIR'], exist_ok=True)
+    app.extensions['audit_jobs'] = AuditJobQueue(app)
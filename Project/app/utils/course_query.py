@@ -0,0 +1,111 @@
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+_GENED_SPLIT = re.compile(r'[;,]')
+
+# 'Humanities' in the explorer means either humanities subcategory
+HUMANITIES = 'Humanities'
+HUMANITIES_GENEDS = ('Humanities - Hist & Phil', 'Humanities - Lit & Arts')
+
+
+def split_geneds(value: str) -> List[str]:
+    return [part.strip() for part in _GENED_SPLIT.split(value) if part.strip()]
+
+
+class CatalogIndex:
+    """
+    Department and gen-ed postings over the course catalog.
+
+    Each posting is kept both as a set (for intersections and membership
+    tests) and as a list in catalog order (for walking results in order).
+    """
+
+    def __init__(self, courses: List[Dict[str, str]]):
+        self.size = len(courses)
+        departments: Dict[str, List[int]] = {}
+        geneds: Dict[str, List[int]] = {}
+        for i, course in enumerate(courses):
+            if course['department']:
+                departments.setdefault(course['department'], []).append(i)
+            course_geneds = split_geneds(course['gen_ed_requirements'])
+            for gened in course_geneds:
+                geneds.setdefault(gened, []).append(i)
+            if any(gened in HUMANITIES_GENEDS for gened in course_geneds):
+                geneds.setdefault(HUMANITIES, []).append(i)
+
+        self._departments = {key: (ids, set(ids)) for key, ids in departments.items()}
+        self._geneds = {key: (ids, set(ids)) for key, ids in geneds.items()}
+
+    def department(self, name: str) -> Tuple[List[int], Set[int]]:
+        return self._departments.get(name, ([], set()))
+
+    def gened(self, name: str) -> Tuple[List[int], Set[int]]:
+        return self._geneds.get(name, ([], set()))
+
+
+class QueryPlan:
+    """Filters ordered from most to least selective"""
+
+    def __init__(self, steps: List[Tuple[str, List[int], Set[int]]], ranked: bool):
+        # (label, ids in catalog order, id set)
+        self.steps = steps
+        self.ranked = ranked
+
+    def describe(self, limit: int) -> str:
+        parts = [f"{label}({len(ids)})" for label, _, ids in self.steps] or ['scan']
+        parts.append(f"rank-top({limit})" if self.ranked else f"first({limit})")
+        return ' -> '.join(parts)
+
+
+def plan_query(index: CatalogIndex, department: str, geneds: Sequence[str],
+               scores: Optional[Dict[int, float]] = None) -> QueryPlan:
+    """
+    Order the filters of an /api/courses request by their index sizes.
+
+    The search (if any) has already been scored, so its candidate set takes
+    part in the ordering like any other filter.
+    """
+    steps: List[Tuple[str, List[int], Set[int]]] = []
+    if department != 'all':
+        ids, id_set = index.department(department)
+        steps.append((f"department={department}", ids, id_set))
+    for gened in dict.fromkeys(geneds):
+        ids, id_set = index.gened(gened)
+        steps.append((f"gened={gened}", ids, id_set))
+    if scores is not None:
+        steps.append(('search', list(scores), set(scores)))
+    steps.sort(key=lambda step: len(step[2]))
+    return QueryPlan(steps, ranked=scores is not None)
+
+
+def execute_plan(plan: QueryPlan, size: int, limit: int) -> Tuple[List[int], Set[int], int]:
+    """
+    Run a plan, returning (first ids in catalog order, all matching ids, total).
+
+    Starts from the smallest candidate set and intersects the rest in order,
+    stopping as soon as the candidates run out. Unranked plans then walk the
+    smallest posting in catalog order and stop after limit matches; ranked
+    plans leave ordering to the caller.
+    """
+    if not plan.steps:
+        return list(range(min(limit, size))), set(), size
+
+    _, driver, candidates = plan.steps[0]
+    for _, _, ids in plan.steps[1:]:
+        if not candidates:
+            break
+        candidates = candidates & ids
+
+    if plan.ranked:
+        return [], candidates, len(candidates)
+
+    first: List[int] = []
+    if len(plan.steps) == 1:
+        first = driver[:limit]
+    else:
+        for doc in driver:
+            if doc in candidates:
+                first.append(doc)
+                if len(first) == limit:
+                    break
+    return first, candidates, len(candidates)
@@ -0,0 +1,182 @@
+"""
+Local TF-IDF retrieval of candidate courses for the AI assistant.
+
+Instead of sending every course in a few departments to the model, the
+student's major, goals and priorities are matched against course names,
+descriptions and gen-ed labels here, and only the top-k courses go into the
+prompt. Everything runs offline; try it from the Project directory with:
+
+    python -m app.utils.course_retrieval "I like data and music" --major CS
+"""
+import argparse
+import csv
+import heapq
+import re
+from collections import Counter
+from math import log, sqrt
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.utils.course_search import tokenize
+
+DATA_PATH = Path(__file__).resolve().parent.parent / 'all_courses.csv'
+
+# Field weights when building a course's term counts
+NAME_WEIGHT = 3
+GENED_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+# Query weights: goals say more about what to recommend than the major does
+GOALS_WEIGHT = 1.0
+MAJOR_WEIGHT = 0.5
+
+# Multipliers applied for the assistant's priority checkboxes
+GENED_PRIORITY_BOOST = 1.25
+LEVEL_PRIORITY_BOOST = 1.15
+
+_LEVEL = re.compile(r'\s(\d)\d\d$')
+
+STOPWORDS = frozenset("""
+a an and are as at be by course courses for from in into is it its of on or
+such than that the their this to topics with will students student study
+studies introduction intro i me my want like interested learn take taking
+more about also credit hours hrs prerequisite prerequisites
+""".split())
+
+
+def _stem(token: str) -> str:
+    """Very light stemming so 'games' matches 'game' and 'studies' 'study'"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def terms(text: str) -> List[str]:
+    return [_stem(token) for token in tokenize(text) if token not in STOPWORDS and not token.isdigit()]
+
+
+def course_level(course_code: str) -> Optional[int]:
+    """100, 200, ... from 'CS 225', None if there's no number"""
+    match = _LEVEL.search(course_code)
+    return int(match.group(1)) * 100 if match else None
+
+
+class CourseRetriever:
+    """TF-IDF vectors of every course with an inverted index for cosine top-k"""
+
+    def __init__(self, courses: List[Dict[str, str]]):
+        self.courses = courses
+        counts: List[Counter] = []
+        document_frequency: Counter = Counter()
+        for course in courses:
+            course_terms: Counter = Counter()
+            for term in terms(course['course_name']):
+                course_terms[term] += NAME_WEIGHT
+            for term in terms(course['gen_ed_requirements']):
+                course_terms[term] += GENED_WEIGHT
+            for term in terms(course['description']):
+                course_terms[term] += DESCRIPTION_WEIGHT
+            counts.append(course_terms)
+            document_frequency.update(course_terms.keys())
+
+        total = len(courses)
+        self.idf: Dict[str, float] = {
+            term: log((1 + total) / (1 + frequency)) + 1
+            for term, frequency in document_frequency.items()
+        }
+
+        # term -> [(course index, normalized tf-idf weight)]
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc, course_terms in enumerate(counts):
+            vector = {term: (1 + log(count)) * self.idf[term] for term, count in course_terms.items()}
+            norm = sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+            for term, weight in vector.items():
+                self.postings.setdefault(term, []).append((doc, weight / norm))
+
+    def _query_vector(self, major: str, goals: str) -> Dict[str, float]:
+        weights: Counter = Counter()
+        for term in terms(goals):
+            weights[term] += GOALS_WEIGHT
+        for term in terms(major):
+            weights[term] += MAJOR_WEIGHT
+        vector = {
+            term: (1 + log(weight) if weight >= 1 else weight) * self.idf[term]
+            for term, weight in weights.items()
+            if term in self.idf
+        }
+        norm = sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def _priority_boost(self, course: Dict[str, str], priorities: Sequence[str]) -> float:
+        boost = 1.0
+        if 'gened' in priorities and course['gen_ed_requirements']:
+            boost *= GENED_PRIORITY_BOOST
+        level = course_level(course['course_code'])
+        if level is not None:
+            if 'balance' in priorities and level <= 200:
+                boost *= LEVEL_PRIORITY_BOOST
+            if 'challenge' in priorities and 300 <= level <= 499:
+                boost *= LEVEL_PRIORITY_BOOST
+        return boost
+
+    def top_k(self, major: str, goals: str, priorities: Sequence[str] = (), k: int = 40) -> List[Tuple[Dict[str, str], float]]:
+        """The k courses most similar to the student's input, with their scores"""
+        query = self._query_vector(major, goals)
+        scores: Dict[int, float] = {}
+        for term, query_weight in query.items():
+            for doc, weight in self.postings.get(term, ()):
+                scores[doc] = scores.get(doc, 0.0) + query_weight * weight
+
+        # Graduate courses (500+) are rarely what an undergraduate asks for
+        for doc in scores:
+            course = self.courses[doc]
+            level = course_level(course['course_code'])
+            if level is not None and level >= 500:
+                scores[doc] *= 0.5
+            scores[doc] *= self._priority_boost(course, priorities)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(self.courses[doc], score) for doc, score in best if score > 0]
+
+
+def format_course_context(courses: List[Dict[str, str]], description_length: int = 160) -> str:
+    """One prompt line per candidate course"""
+    lines = []
+    for course in courses:
+        if not course['course_code'] or not course['course_name']:
+            continue
+        line = f"- {course['course_code']}: {course['course_name']} ({course['credit_hours']} hrs)"
+        if course['gen_ed_requirements']:
+            line += f" - {course['gen_ed_requirements']}"
+        description = course['description']
+        if description:
+            if len(description) > description_length:
+                description = description[:description_length].rsplit(' ', 1)[0] + '...'
+            line += f": {description}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _load_csv(path: Path) -> List[Dict[str, str]]:
+    fields = ('course_code', 'course_name', 'credit_hours', 'department', 'gen_ed_requirements', 'description')
+    with path.open('r', encoding='utf-8-sig', newline='') as handle:
+        return [{field: (row.get(field) or '').strip() for field in fields} for row in csv.DictReader(handle)]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Show the courses the AI assistant would be given')
+    parser.add_argument('goals')
+    parser.add_argument('--major', default='')
+    parser.add_argument('--priority', action='append', default=[], choices=['gened', 'balance', 'challenge'])
+    parser.add_argument('-k', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    retriever = CourseRetriever(_load_csv(DATA_PATH))
+    for course, score in retriever.top_k(args.major, args.goals, args.priority, k=args.k):
+        print(f"{score:.3f}  {course['course_code']:<10} {course['course_name']}  [{course['gen_ed_requirements']}]")
+
+
+if __name__ == '__main__':
+    main()
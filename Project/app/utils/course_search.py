@@ -0,0 +1,412 @@
+import heapq
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from math import log
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_CODE_QUERY = re.compile(r'^\s*([a-z]{2,5})\s*[-_.]?\s*(\d{1,3})\s*$', re.IGNORECASE)
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+# BM25 parameters for description scoring
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Weights layered on top of the exact/prefix/substring tiers
+NAME_TOKEN_WEIGHT = 250
+NAME_FUZZY_WEIGHT = 150
+DESCRIPTION_WEIGHT = 15
+DESCRIPTION_CAP = 90
+
+# Expansion limits that keep one query well inside the latency budget
+MIN_FUZZY_LENGTH = 4
+DELETE_PREFIX_LENGTH = 7
+MIN_PREFIX_LENGTH = 3
+MIN_TOKEN_QUERY = 2
+MIN_SUBSTRING_QUERY = 3
+MIN_DESCRIPTION_QUERY = 3
+MIN_DESCRIPTION_SUBSTRING = 4
+STOPWORD_DOCUMENT_RATIO = 0.5
+DENSE_HIT_RATIO = 8
+MIN_DENSE_HITS = 16
+MAX_PREFIX_TERMS = 20
+MAX_CACHED_EXPANSIONS = 10000
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens"""
+    return _TOKEN.findall(text.lower())
+
+
+def normalize_course_code(query: str) -> Optional[str]:
+    """Convert 'cs225', 'CS-225' or 'cs 225' to 'CS 225' (None if not a code)"""
+    match = _CODE_QUERY.match(query)
+    if not match:
+        return None
+    return f"{match.group(1).upper()} {match.group(2)}"
+
+
+def max_edits(term: str) -> int:
+    """Edit budget for a query term, short terms must match exactly"""
+    if len(term) < MIN_FUZZY_LENGTH:
+        return 0
+    if len(term) < 8:
+        return 1
+    return 2
+
+
+def deletes(term: str) -> List[str]:
+    """Every string obtained by deleting one character from term"""
+    return [term[:i] + term[i + 1:] for i in range(len(term))]
+
+
+def edits(term: str) -> List[str]:
+    """Every string one insertion, substitution or adjacent transposition away from term"""
+    splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+    inserted = [head + char + tail for head, tail in splits for char in _ALPHABET]
+    replaced = [head + char + tail[1:] for head, tail in splits if tail for char in _ALPHABET if char != tail[0]]
+    swapped = [head + tail[1] + tail[0] + tail[2:] for head, tail in splits if len(tail) > 1]
+    return inserted + replaced + swapped
+
+
+def _same_length_distance(a: str, b: str) -> int:
+    """Edit distance of two equal-length strings known to be at most 2 apart"""
+    diffs = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+    if len(diffs) <= 1:
+        return len(diffs)
+    if len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]:
+        # Adjacent transposition
+        return 1
+    return 2
+
+
+class _FieldCorpus:
+    """One text field of every course joined into a single string (each value ends with '\x00')"""
+
+    def __init__(self, values: List[str]):
+        self.values = values
+        self.starts: List[int] = []
+        offset = 0
+        for value in values:
+            self.starts.append(offset)
+            offset += len(value) + 1
+        self.text = ''.join(value + '\x00' for value in values)
+        # Value indexes in value order, for prefix lookups
+        self._order = sorted(range(len(values)), key=values.__getitem__)
+        self._sorted = [values[i] for i in self._order]
+
+    def starting_with(self, prefix: str) -> List[int]:
+        """Indexes of values starting with prefix (in value order)"""
+        start = bisect_left(self._sorted, prefix)
+        return self._order[start:bisect_left(self._sorted, prefix + '\U0010ffff', start)]
+
+    def find_all(self, query: str) -> List[int]:
+        """Indexes of values containing query, found with one C-level scan"""
+        text = self.text
+        hits = []
+        starts = self.starts
+        last = len(starts) - 1
+        position = text.find(query)
+        while position != -1:
+            doc = bisect_right(starts, position) - 1
+            hits.append(doc)
+            if doc >= last:
+                break
+            if len(hits) >= MIN_DENSE_HITS and len(hits) * DENSE_HIT_RATIO > doc:
+                # Most values match after all, check the rest one by one
+                values = self.values
+                hits.extend(i for i in range(doc + 1, len(values)) if query in values[i])
+                break
+            position = text.find(query, starts[doc + 1])
+        return hits
+
+
+class CourseSearchIndex:
+    """
+    Ranked, typo-tolerant search over the course catalog.
+
+    Built once from the loaded course records. Candidates come from a
+    substring scan of code, name and description (the old behaviour) plus
+    token matches, where each query token is expanded to vocabulary terms
+    within a small edit distance and, for the last token, to terms it is a
+    prefix of. Short tokens try every single edit against the vocabulary;
+    tokens long enough for two edits go through a symmetric-delete index
+    keyed on the first DELETE_PREFIX_LENGTH characters of each term. Scores
+    keep the old exact/prefix/substring tiers on code and name and add name
+    token hits and BM25 over the description.
+
+    Queries that would match most of the catalog are cut down: one or two
+    characters only match code and name prefixes (and whole title words),
+    the description substring scan needs MIN_DESCRIPTION_SUBSTRING
+    characters, and stopwords ('the', 'and') only narrow a query that has
+    nothing else.
+    """
+
+    def __init__(self, courses: List[Dict[str, str]]):
+        self.size = len(courses)
+        self._codes = _FieldCorpus([course['course_code'].lower() for course in courses])
+        self._names = _FieldCorpus([course['course_name'].lower() for course in courses])
+        self._descriptions = [course['description'].lower() for course in courses]
+
+        # Token postings: code and name, name only (for ranking); descriptions use the BM25 map
+        self._name_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._title_postings: Dict[str, Set[int]] = defaultdict(set)
+        description_tf: Dict[str, Dict[int, int]] = defaultdict(dict)
+        doc_lengths: List[int] = []
+
+        for i in range(self.size):
+            for token in tokenize(self._codes.values[i]):
+                self._title_postings[token].add(i)
+            for token in tokenize(self._names.values[i]):
+                self._title_postings[token].add(i)
+                self._name_postings[token].add(i)
+            description_tokens = tokenize(self._descriptions[i])
+            doc_lengths.append(len(description_tokens))
+            for token in description_tokens:
+                counts = description_tf[token]
+                counts[i] = counts.get(i, 0) + 1
+
+        # Precomputed (scaled and capped) BM25 contribution of every (term, course) pair
+        average_length = (sum(doc_lengths) / self.size) if self.size else 0.0
+        self._bm25: Dict[str, Dict[int, float]] = {}
+        for term, counts in description_tf.items():
+            idf = log(1 + (self.size - len(counts) + 0.5) / (len(counts) + 0.5))
+            weights = {}
+            for doc, tf in counts.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths[doc] / (average_length or 1))
+                bm25 = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                weights[doc] = min(bm25 * DESCRIPTION_WEIGHT, DESCRIPTION_CAP)
+            self._bm25[term] = weights
+        # Terms in most descriptions carry almost no idf, skip them when scoring
+        self._stopwords = {
+            term for term, counts in description_tf.items()
+            if len(counts) > self.size * STOPWORD_DOCUMENT_RATIO
+        }
+
+        # Description vocabulary, scanned instead of the (much larger) text
+        self._description_terms = _FieldCorpus(sorted(description_tf))
+
+        # Vocabulary lookups for fuzzy and prefix expansion
+        self._vocabulary_set = self._title_postings.keys() | self._bm25.keys()
+        self._vocabulary = sorted(self._vocabulary_set)
+        # Symmetric-delete index over the terms a two-edit token can reach through it:
+        # the first DELETE_PREFIX_LENGTH characters, and those with one removed -> terms
+        self._deletes: Dict[str, List[str]] = defaultdict(list)
+        for term in self._vocabulary:
+            if max_edits(term) >= 2:
+                prefix = term[:DELETE_PREFIX_LENGTH]
+                for key in {prefix, *deletes(prefix)}:
+                    self._deletes[key].append(term)
+        self._expansions: Dict[Tuple[str, bool], Dict[str, int]] = {}
+
+    def _fuzzy_terms(self, term: str) -> Dict[str, int]:
+        """
+        Vocabulary terms within the edit budget of term (term -> distance).
+
+        Candidates share a string once at most one character is removed from
+        the term and one from the candidate, which covers one insertion,
+        deletion, substitution or transposition, and two substitutions.
+        Terms with a budget of one generate those edits directly; longer
+        ones look up candidates sharing a (one character shorter) prefix in
+        the delete index and check them. Terms with a budget of two also try
+        dropping two characters.
+        """
+        limit = max_edits(term)
+        matches: Dict[str, int] = {}
+        if term in self._vocabulary_set:
+            matches[term] = 0
+        if limit == 0:
+            return matches
+
+        vocabulary = self._vocabulary_set
+        # Candidate is missing one character of the term
+        variants = set(deletes(term))
+        for variant in variants:
+            if variant in vocabulary:
+                matches.setdefault(variant, 1)
+        if limit == 1:
+            # Candidate has one extra character, a substitution or a transposition
+            for candidate in edits(term):
+                if candidate in vocabulary:
+                    matches.setdefault(candidate, 1)
+            return matches
+
+        prefix = term[:DELETE_PREFIX_LENGTH]
+        for key in {prefix, *deletes(prefix)}:
+            for candidate in self._deletes.get(key, ()):
+                if candidate in matches:
+                    continue
+                if len(candidate) == len(term) + 1:
+                    # Candidate has one extra character
+                    if term in deletes(candidate):
+                        matches[candidate] = 1
+                elif len(candidate) == len(term) and not variants.isdisjoint(deletes(candidate)):
+                    # Candidate differs by a substitution or transposition (or two edits)
+                    matches[candidate] = _same_length_distance(term, candidate)
+        for variant in variants:
+            for shorter in deletes(variant):
+                if shorter in vocabulary:
+                    matches.setdefault(shorter, 2)
+        return matches
+
+    def _prefix_terms(self, term: str) -> List[str]:
+        if len(term) < MIN_PREFIX_LENGTH:
+            return []
+        start = bisect_left(self._vocabulary, term)
+        end = bisect_left(self._vocabulary, term + '\x7f', start)
+        return self._vocabulary[start:min(end, start + MAX_PREFIX_TERMS)]
+
+    def expand(self, term: str, as_prefix: bool = False) -> Dict[str, int]:
+        """Terms a query token may stand for, with their edit distance"""
+        key = (term, as_prefix)
+        cached = self._expansions.get(key)
+        if cached is not None:
+            return cached
+        terms = self._fuzzy_terms(term)
+        if as_prefix:
+            for candidate in self._prefix_terms(term):
+                terms.setdefault(candidate, 0)
+        if len(self._expansions) >= MAX_CACHED_EXPANSIONS:
+            self._expansions.clear()
+        self._expansions[key] = terms
+        return terms
+
+    def _description_hits(self, query: str) -> Set[int]:
+        """
+        Courses whose description contains query as a substring.
+
+        Terms are maximal alphanumeric runs, so an inner part of the query
+        must be a whole description term, the first part a suffix of one and
+        the last part a prefix of one. Looking those up in the vocabulary
+        narrows the candidates before the substring check on each description.
+        Three letters ('ion') are inside thousands of descriptions and add
+        nothing the name and token matches don't rank higher, so the scan
+        needs MIN_DESCRIPTION_SUBSTRING.
+        """
+        if len(query) < MIN_DESCRIPTION_SUBSTRING:
+            return set()
+        terms = self._description_terms.values
+        parts = _NON_ALNUM.split(query)
+        if len(parts) == 1:
+            candidates: Set[int] = set()
+            for i in self._description_terms.find_all(query):
+                candidates.update(self._bm25[terms[i]])
+            return candidates
+
+        # Narrow with the most selective part (fewest courses), then check the whole phrase
+        first, last = parts[0], parts[-1]
+        options = [[part] for part in parts[1:-1] if part]
+        if last:
+            # The vocabulary is sorted, so prefix matches are a slice
+            start = bisect_left(terms, last)
+            options.append(terms[start:bisect_left(terms, last + '\x7f', start)])
+        if len(first) >= MIN_TOKEN_QUERY:
+            # Every term ends with '\x00' in the joined vocabulary, so suffix matches are one scan
+            options.append([terms[i] for i in self._description_terms.find_all(first + '\x00')])
+        if not options:
+            return {doc for doc, text in enumerate(self._descriptions) if query in text}
+        group = min(options, key=lambda group: sum(len(self._bm25.get(term, ())) for term in group))
+        candidates = set()
+        for term in group:
+            candidates.update(self._bm25.get(term, ()))
+        return {doc for doc in candidates if query in self._descriptions[doc]}
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """Relevance score of every course matching query (course index -> score)"""
+        query = query.strip().lower()
+        if not query:
+            return {}
+
+        code_query = normalize_course_code(query)
+        code_query = code_query.lower() if code_query else query
+
+        if len(query) < MIN_SUBSTRING_QUERY:
+            # One or two characters are inside most names, only use prefixes
+            code_hits = self._codes.starting_with(code_query)
+            name_hits = self._names.starting_with(query)
+        else:
+            code_hits = self._codes.find_all(code_query)
+            name_hits = self._names.find_all(query)
+        description_hits = self._description_hits(query)
+
+        # Every query token must be matched (exactly, fuzzily or as a prefix)
+        tokens = tokenize(query) if len(query) >= MIN_TOKEN_QUERY else []
+        expansions = [
+            self.expand(token, as_prefix=(index == len(tokens) - 1))
+            for index, token in enumerate(tokens)
+        ]
+        # Stopwords ('history of the') narrow nothing unless the query has nothing else
+        narrowing = [position for position, token in enumerate(tokens) if token not in self._stopwords]
+        token_matches: Optional[Set[int]] = None
+        for position in narrowing or range(len(tokens)):
+            # Short words like 'in' and stopwords like 'the' would match most descriptions
+            short = len(tokens[position]) < MIN_DESCRIPTION_QUERY
+            docs: Set[int] = set()
+            for term in expansions[position]:
+                docs |= self._title_postings.get(term, set())
+                if not short and term not in self._stopwords:
+                    docs.update(self._bm25.get(term, ()))
+            token_matches = docs if token_matches is None else token_matches & docs
+            if not token_matches:
+                break
+
+        scores: Dict[int, float] = dict.fromkeys(token_matches or (), 0)
+        scores.update(dict.fromkeys(description_hits, 100))
+        codes = self._codes.values
+        for doc in code_hits:
+            code = codes[doc]
+            if code == code_query:
+                tier = 1000
+            elif code.startswith(code_query):
+                tier = 800
+            else:
+                tier = 600
+            scores[doc] = scores.get(doc, 0) + tier
+        names = self._names.values
+        for doc in name_hits:
+            name = names[doc]
+            if name == query:
+                tier = 900
+            elif name.startswith(query):
+                tier = 700
+            else:
+                tier = 500
+            scores[doc] = scores.get(doc, 0) + tier
+
+        for terms in expansions:
+            for term, distance in terms.items():
+                weight = NAME_TOKEN_WEIGHT if distance == 0 else NAME_FUZZY_WEIGHT
+                for doc in self._name_postings.get(term, ()):
+                    if doc in scores:
+                        scores[doc] += weight
+                if term in self._stopwords:
+                    continue
+                bm25 = self._bm25.get(term)
+                if bm25:
+                    factor = 1 / (1 + distance)
+                    for doc in scores.keys() & bm25.keys():
+                        scores[doc] += bm25[doc] * factor
+
+        return scores
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[int]:
+        """Indexes of matching courses, most relevant first"""
+        return rank(self.scores(query), limit=limit)
+
+
+def rank(scores: Dict[int, float], candidates: Optional[Iterable[int]] = None,
+         limit: Optional[int] = None) -> List[int]:
+    """Order course indexes by score, highest first (equal scores by catalog order)"""
+    docs = scores if candidates is None else candidates
+    if limit is not None:
+        docs = list(docs) if limit > 0 else []
+        if len(docs) > limit:
+            # Find the cutoff score on the bare scores, then catalog position breaks
+            # ties so the cutoff keeps the earlier of equal scores
+            cutoff = heapq.nlargest(limit, [scores[doc] for doc in docs])[-1]
+            tied = [doc for doc in docs if scores[doc] == cutoff]
+            docs = [doc for doc in docs if scores[doc] > cutoff]
+            docs += heapq.nsmallest(limit - len(docs), tied)
+    return sorted(docs, key=lambda doc: (-scores[doc], doc))
@@ -0,0 +1,213 @@
+"""
+Reviews and course chat messages, read and written through one store.
+
+Routes go through app.extensions['data_store'] for both reads and writes,
+so a review or message is always read back from the store it was written
+to. DATA_STORE picks the store:
+
+    supabase    the Supabase REST API (app/super.py); the default
+    sqlalchemy  the app database through the models, for local development,
+                tests and load testing without Supabase
+
+Both return rows as dicts shaped like Supabase's responses: timestamps as
+ISO strings, and reviews and messages listed with an embedded `author`
+({id, name, email}).
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import super as sb
+from app.models import Message, Review, User, db
+from app.utils.instrumentation import timed
+
+# Review fields a user fills in (create_review/update_review keyword arguments)
+REVIEW_FIELDS = ('rating', 'difficulty', 'workload', 'title', 'comment',
+                 'semester_taken', 'professor', 'grade_received')
+
+
+class SupabaseStore:
+    name = 'supabase'
+    # Rows live outside the app database (account deletion clears them separately)
+    is_remote = True
+
+    @timed('supabase')
+    def reviews_for_course(self, course_code: str, approved_only: bool = True) -> List[Dict[str, Any]]:
+        return sb.get_reviews_by_course(course_code, approved_only=approved_only)
+
+    @timed('supabase')
+    def user_review(self, user_id: int, course_code: str) -> Optional[Dict[str, Any]]:
+        return sb.get_user_review_for_course(user_id, course_code)
+
+    @timed('supabase')
+    def create_review(self, course_code: str, user_id: int, **fields) -> Optional[Dict[str, Any]]:
+        return sb.create_review(course_code=course_code, user_id=user_id, **fields)
+
+    @timed('supabase')
+    def update_review(self, review_id: int, **fields) -> bool:
+        return sb.update_review(review_id=review_id, **fields)
+
+    @timed('supabase')
+    def delete_review(self, review_id: int) -> bool:
+        return sb.delete_review(review_id)
+
+    @timed('supabase')
+    def messages_for_course(self, course_code: str, limit: int = 100) -> List[Dict[str, Any]]:
+        return sb.get_messages_by_course(course_code, limit=limit)
+
+    @timed('supabase')
+    def create_message(self, course_code: str, user_id: int, content: str) -> Optional[Dict[str, Any]]:
+        return sb.create_message(course_code, user_id, content)
+
+    @timed('supabase')
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        return sb.get_message_by_id(message_id)
+
+    @timed('supabase')
+    def delete_own_message(self, message_id: int, user_id: int) -> bool:
+        return sb.soft_delete_message(message_id, user_id=user_id)
+
+
+def _row(model, obj) -> Dict[str, Any]:
+    row = {}
+    for column in model.__table__.columns:
+        value = getattr(obj, column.key)
+        row[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+def _with_author(model, obj, author: User) -> Dict[str, Any]:
+    row = _row(model, obj)
+    row['author'] = {'id': author.id, 'name': author.name, 'email': author.email}
+    return row
+
+
+class SQLAlchemyStore:
+    """
+    The same calls against the app database.
+
+    Each write commits on its own, as a Supabase request does; errors are
+    printed and rolled back, and reported the way super.py reports them
+    (None, [] or False).
+    """
+
+    name = 'sqlalchemy'
+    is_remote = False
+
+    def reviews_for_course(self, course_code: str, approved_only: bool = True) -> List[Dict[str, Any]]:
+        try:
+            query = db.session.query(Review, User).join(User, Review.user_id == User.id).filter(
+                Review.course_code == course_code)
+            if approved_only:
+                query = query.filter(Review.is_approved.is_(True))
+            return [_with_author(Review, review, author)
+                    for review, author in query.order_by(Review.created_at.desc())]
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error getting reviews by course: {e}")
+            return []
+
+    def user_review(self, user_id: int, course_code: str) -> Optional[Dict[str, Any]]:
+        try:
+            review = Review.query.filter_by(user_id=user_id, course_code=course_code).first()
+            return _row(Review, review) if review else None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error getting user review: {e}")
+            return None
+
+    def create_review(self, course_code: str, user_id: int, **fields) -> Optional[Dict[str, Any]]:
+        try:
+            review = Review(course_code=course_code, user_id=user_id, is_approved=True, is_flagged=False,
+                            **{key: fields.get(key) for key in REVIEW_FIELDS})
+            db.session.add(review)
+            db.session.flush()
+            row = _row(Review, review)
+            db.session.commit()
+            return row
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error creating review: {e}")
+            return None
+
+    def update_review(self, review_id: int, **fields) -> bool:
+        try:
+            values = {key: fields.get(key) for key in REVIEW_FIELDS}
+            values['updated_at'] = datetime.utcnow()
+            Review.query.filter_by(id=review_id).update(values, synchronize_session=False)
+            db.session.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error updating review: {e}")
+            return False
+
+    def delete_review(self, review_id: int) -> bool:
+        try:
+            Review.query.filter_by(id=review_id).delete(synchronize_session=False)
+            db.session.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error deleting review: {e}")
+            return False
+
+    def messages_for_course(self, course_code: str, limit: int = 100) -> List[Dict[str, Any]]:
+        try:
+            rows = db.session.query(Message, User).join(User, Message.user_id == User.id).filter(
+                Message.course_code == course_code, Message.is_deleted.is_(False)
+            ).order_by(Message.created_at.desc()).limit(limit).all()
+            # Oldest first, like super.get_messages_by_course
+            return [_with_author(Message, message, author) for message, author in reversed(rows)]
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error getting messages: {e}")
+            return []
+
+    def create_message(self, course_code: str, user_id: int, content: str) -> Optional[Dict[str, Any]]:
+        try:
+            message = Message(course_code=course_code, user_id=user_id, content=content,
+                              is_flagged=False, is_deleted=False)
+            db.session.add(message)
+            db.session.flush()
+            author = db.session.get(User, user_id)
+            row = _with_author(Message, message, author) if author else _row(Message, message)
+            db.session.commit()
+            return row
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error creating message: {e}")
+            return None
+
+    def get_message(self, message_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            message = db.session.get(Message, message_id)
+            return _row(Message, message) if message else None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error getting message: {e}")
+            return None
+
+    def delete_own_message(self, message_id: int, user_id: int) -> bool:
+        try:
+            updated = Message.query.filter_by(id=message_id, user_id=user_id).update(
+                {'is_deleted': True}, synchronize_session=False)
+            db.session.commit()
+            return updated > 0
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print(f"Error deleting message: {e}")
+            return False
+
+
+def create_store(name: str):
+    if name == 'sqlalchemy':
+        return SQLAlchemyStore()
+    if name == 'supabase':
+        return SupabaseStore()
+    raise ValueError(f"Unknown DATA_STORE {name!r}")
+
+
+def init_app(app) -> None:
+    app.extensions['data_store'] = create_store(app.config['DATA_STORE'])
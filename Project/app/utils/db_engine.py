@@ -0,0 +1,134 @@
+"""
+SQLAlchemy engine settings per database, and connection pool counters.
+
+engine_options() turns the DB_* config into SQLALCHEMY_ENGINE_OPTIONS:
+
+    SQLite      file databases are switched to WAL with synchronous=NORMAL
+                (readers no longer block the writer, and commits don't wait
+                for an fsync of the main file) and wait DB_BUSY_TIMEOUT ms
+                for a lock instead of failing with "database is locked"
+    PostgreSQL  a pool of DB_POOL_SIZE (+ DB_MAX_OVERFLOW) connections,
+                checked with a ping before use and replaced after
+                DB_POOL_RECYCLE seconds, so connections the server or a
+                proxy has dropped aren't handed to requests
+
+init_app() applies the SQLite pragmas and attaches PoolMetrics to the engine.
+"""
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+
+def normalize_uri(uri: str) -> str:
+    """Supabase/Heroku style postgres:// URLs, which SQLAlchemy no longer accepts"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def is_memory_sqlite(uri) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config) -> Dict[str, Any]:
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend == 'sqlite':
+        # sqlite3 sets busy_timeout from this (in seconds)
+        return {'connect_args': {'timeout': config['DB_BUSY_TIMEOUT'] / 1000}}
+    if backend == 'postgresql':
+        return {
+            'pool_size': config['DB_POOL_SIZE'],
+            'max_overflow': config['DB_MAX_OVERFLOW'],
+            'pool_timeout': config['DB_POOL_TIMEOUT'],
+            'pool_recycle': config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        }
+    return {}
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidated = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.held_seconds = 0.0
+
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is None:
+            return
+        with self._lock:
+            self.checkins += 1
+            self.checked_out -= 1
+            self.held_seconds += time.perf_counter() - started
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        # The record's info is reset with the connection, so account for it here
+        started = connection_record.info.pop('checked_out_at', None)
+        with self._lock:
+            self.invalidated += 1
+            if started is not None:
+                self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        with self._lock:
+            return {
+                'pool': type(pool).__name__,
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidated': self.invalidated,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'mean_held_ms': self.held_seconds / self.checkins * 1000 if self.checkins else 0.0,
+            }
+
+
+def _sqlite_pragmas(config):
+    statements = ['PRAGMA journal_mode = WAL', f"PRAGMA synchronous = {config['DB_SQLITE_SYNCHRONOUS']}"]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+    return on_connect
+
+
+def init_app(app, db) -> None:
+    """Configure the engine Flask-SQLAlchemy created for the app"""
+    with app.app_context():
+        engine = db.engine
+    if app.config['DB_SQLITE_WAL'] and engine.url.get_backend_name() == 'sqlite' and not is_memory_sqlite(engine.url):
+        event.listen(engine, 'connect', _sqlite_pragmas(app.config))
+    app.extensions['db_pool_metrics'] = PoolMetrics(engine)
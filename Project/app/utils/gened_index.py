@@ -0,0 +1,143 @@
+"""
+Which UserRequirements flags each catalog course counts toward.
+
+Built once from all_courses.csv, so resolving a student's courses is a
+dictionary lookup per course and a few set operations. RequirementIndex
+goes the other way, from unmet requirements to the courses that fill them.
+"""
+import csv
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.utils.course_query import split_geneds
+
+DATA_PATH = Path(__file__).resolve().parent.parent / 'all_courses.csv'
+
+# Catalog gen-ed label -> UserRequirements flag
+GENED_FLAGS = {
+    'Composition I': 'composition1',
+    'Advanced Composition': 'advanced_composition',
+    'Quantitative Reasoning I': 'quantitative_reasoning1',
+    'Quantitative Reasoning II': 'quantitative_reasoning2',
+    'Cultural Studies - Western': 'western_culture',
+    'Cultural Studies - Non-West': 'non_western_culture',
+    'Cultural Studies - US Minority': 'us_minority_culture',
+    'Humanities - Hist & Phil': 'humanities_hp',
+    'Humanities - Lit & Arts': 'humanities_la',
+    'Social & Beh Sci - Beh Sci': 'social_behavioral_bsc',
+    'Social & Beh Sci - Soc Sci': 'social_behavioral_ss',
+    'Nat Sci & Tech - Life Sciences': 'natural_sciences_ls',
+    'Nat Sci & Tech - Phys Sciences': 'natural_sciences_ps',
+}
+
+# A category counts as covered once any of its subcategories is
+CATEGORY_FLAGS = {
+    'humanities_arts': frozenset({'humanities_hp', 'humanities_la'}),
+    'social_behavioral': frozenset({'social_behavioral_bsc', 'social_behavioral_ss'}),
+    'natural_sciences': frozenset({'natural_sciences_ls', 'natural_sciences_ps'}),
+}
+
+SUBCATEGORY_FLAGS = frozenset().union(*CATEGORY_FLAGS.values())
+
+
+class GenEdIndex:
+    def __init__(self, courses: Iterable[Dict[str, str]]):
+        # course code -> flags it counts toward (only courses with any)
+        self.flags: Dict[str, FrozenSet[str]] = {}
+        for course in courses:
+            flags = frozenset(
+                GENED_FLAGS[label] for label in split_geneds(course['gen_ed_requirements'] or '')
+                if label in GENED_FLAGS
+            )
+            code = (course['course_code'] or '').strip()
+            if flags and code:
+                self.flags[code] = flags
+
+    def flags_for(self, course_codes: Iterable[str]) -> Set[str]:
+        """Every flag the courses cover, categories included"""
+        covered: Set[str] = set()
+        for code in course_codes:
+            covered |= self.flags.get(code, frozenset())
+        covered.update(category for category, subflags in CATEGORY_FLAGS.items() if covered & subflags)
+        return covered
+
+
+@lru_cache(maxsize=1)
+def load_gened_index(path: Path = DATA_PATH) -> GenEdIndex:
+    with open(path, 'r', encoding='utf-8-sig', newline='') as handle:
+        return GenEdIndex(csv.DictReader(handle))
+
+
+class RequirementIndex:
+    """
+    Inverted requirement -> course index for "courses that fill my gen-eds".
+
+    Each flag in GENED_FLAGS gets a bit and each course a mask of the flags
+    it counts toward, so how many of a student's unmet requirements a course
+    covers is the popcount of (course mask & unmet mask). There are only
+    2**13 possible unmet sets, so rankings are cached per mask.
+    """
+
+    def __init__(self, courses: Sequence[Dict[str, str]], gpas: Optional[Dict[str, float]] = None):
+        gpas = gpas or {}
+        self.bits: Dict[str, int] = {flag: 1 << bit for bit, flag in enumerate(GENED_FLAGS.values())}
+        self.courses: List[Dict[str, str]] = []
+        self.masks: List[int] = []
+        self.gpas: List[Optional[float]] = []
+        self.postings: Dict[str, List[int]] = {flag: [] for flag in self.bits}
+
+        for course in courses:
+            mask = 0
+            for label in split_geneds(course['gen_ed_requirements'] or ''):
+                if label in GENED_FLAGS:
+                    mask |= self.bits[GENED_FLAGS[label]]
+            if not mask:
+                continue
+            doc = len(self.courses)
+            self.courses.append(course)
+            self.masks.append(mask)
+            self.gpas.append(gpas.get(course['course_code']))
+            for flag, bit in self.bits.items():
+                if mask & bit:
+                    self.postings[flag].append(doc)
+
+        self._ranked = lru_cache(maxsize=1024)(self._rank)
+
+    def mask(self, flags: Iterable[str]) -> int:
+        mask = 0
+        for flag in flags:
+            mask |= self.bits.get(flag, 0)
+        return mask
+
+    def flags(self, mask: int) -> List[str]:
+        return [flag for flag, bit in self.bits.items() if mask & bit]
+
+    def _rank(self, unmet: int) -> Tuple[int, ...]:
+        """Every course covering any unmet requirement, best first"""
+        candidates: Set[int] = set()
+        for flag in self.flags(unmet):
+            candidates.update(self.postings[flag])
+        masks, gpas, courses = self.masks, self.gpas, self.courses
+        # Most requirements covered, then highest GPA (courses without GPA data last)
+        return tuple(sorted(candidates, key=lambda doc: (
+            -(masks[doc] & unmet).bit_count(),
+            gpas[doc] is None,
+            -(gpas[doc] or 0.0),
+            courses[doc]['course_code'],
+        )))
+
+    def recommend(self, unmet_flags: Iterable[str], limit: int = 20) -> Tuple[List[Tuple[Dict[str, str], List[str], Optional[float]]], int]:
+        """
+        Courses for the unmet requirements, as (course, flags it covers, GPA).
+
+        Also returns how many courses cover at least one of them.
+        """
+        unmet = self.mask(unmet_flags)
+        if not unmet:
+            return [], 0
+        ranked = self._ranked(unmet)
+        return [
+            (self.courses[doc], self.flags(self.masks[doc] & unmet), self.gpas[doc])
+            for doc in ranked[:limit]
+        ], len(ranked)
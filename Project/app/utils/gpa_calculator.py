@@ -57,6 +57,24 @@ def calculate_section_gpa(row: Dict) -> Optional[float]:
         return None
 
 
+@lru_cache(maxsize=1)
+def load_course_gpas() -> Dict[str, float]:
+    """Student-weighted overall GPA of every course, keyed like 'CS 124'"""
+    totals: Dict[str, List[float]] = {}
+
+    for row in load_gpa_data():
+        section_gpa = calculate_section_gpa(row)
+        students = int(row.get('Students', 0) or 0)
+        if section_gpa is None or students == 0:
+            continue
+        course_code = f"{row.get('Subject', '')} {row.get('Number', '')}"
+        total = totals.setdefault(course_code, [0.0, 0])
+        total[0] += section_gpa * students
+        total[1] += students
+
+    return {course_code: round(points / students, 2) for course_code, (points, students) in totals.items()}
+
+
 def format_semester(year_term: str) -> str:
     """Convert '2025-sp' to 'Spring 2025' and the rest as well"""
     if not year_term or '-' not in year_term:
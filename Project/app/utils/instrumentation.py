@@ -0,0 +1,252 @@
+"""
+Request timing: spans, Server-Timing headers and Prometheus metrics.
+
+Code marks the parts of a request worth knowing about with span():
+
+    with span('gpa'):
+        stats = get_course_gpa_stats(course_code)
+
+or @timed('supabase') on a function. Spans with the same name add up, so
+three Supabase calls show as one 'supabase' entry with a count. Outside a
+request (background threads, the CLI) a span does nothing but call through.
+SQL statements ('db') and template rendering ('render') are timed from
+SQLAlchemy and Flask's own events.
+
+With SERVER_TIMING=1 (the default only in debug, since it tells any client
+how long each part of the server took) each response gets a Server-Timing
+header, which browsers show in the network panel:
+
+    Server-Timing: supabase;dur=41.2;desc="2 calls", gpa;dur=3.1, render;dur=6.0, total;dur=52.7
+
+and the durations go into per-endpoint histograms
+(app.extensions['request_metrics']), served with the app's cache and pool
+counters at /metrics in the Prometheus text format. Metrics are per worker
+process; Prometheus sums them across workers. /metrics requires
+METRICS_TOKEN as a bearer token, and isn't registered at all without one.
+"""
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import Response, abort, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+# Seconds; covers cache hits (under 5 ms) up to uncached AI calls
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            series = [(labels, list(counts), total, count)
+                      for labels, (counts, total, count) in sorted(self._series.items())]
+        for label_values, counts, total, count in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_bucket{{{labels},le="+Inf"}} {count}'
+            yield f'{self.name}_sum{{{labels}}} {total}'
+            yield f'{self.name}_count{{{labels}}} {count}'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.requests = Histogram('http_request_duration_seconds', 'Time to produce a response',
+                                  ('endpoint', 'method', 'status'))
+        self.spans = Histogram('request_span_duration_seconds', 'Time spent in each kind of work per request',
+                               ('endpoint', 'span'))
+
+    def observe(self, endpoint: str, method: str, status: int, total: float,
+                spans: Dict[str, List[float]]) -> None:
+        self.requests.observe(total, endpoint, method, str(status))
+        for name, (seconds, _calls) in spans.items():
+            self.spans.observe(seconds, endpoint, name)
+
+
+def _spans() -> Optional[Dict[str, List[float]]]:
+    """This request's {span name: [seconds, calls]}, None outside a request"""
+    if not has_request_context():
+        return None
+    spans = g.get('_spans')
+    if spans is None:
+        spans = g._spans = {}
+    return spans
+
+
+def add_span(name: str, seconds: float) -> None:
+    spans = _spans()
+    if spans is None:
+        return
+    entry = spans.get(name)
+    if entry is None:
+        spans[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_span(name, time.perf_counter() - start)
+
+
+def timed(name: str) -> Callable:
+    """Decorator: time every call of the function as a span"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def server_timing(spans: Dict[str, List[float]], total: float) -> str:
+    parts = []
+    for name, (seconds, calls) in spans.items():
+        part = f'{name};dur={seconds * 1000:.1f}'
+        if calls > 1:
+            part += f';desc="{calls} calls"'
+        parts.append(part)
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def _counters(app) -> Iterator[Tuple[str, str, str, float]]:
+    """(name, type, help, value) for the app's caches and connection pool"""
+    users = app.extensions.get('users')
+    if users is not None:
+        stats = users.stats()
+        yield 'user_cache_entries', 'gauge', 'Users cached in this process', stats['size']
+        yield 'user_cache_hits_total', 'counter', 'User lookups served from the cache', stats['hits']
+        yield 'user_cache_misses_total', 'counter', 'User lookups that queried the database', stats['misses']
+        yield 'user_cache_invalidations_total', 'counter', 'Cached users dropped after a change', stats['invalidations']
+
+    ai_cache = app.extensions.get('ai_cache')
+    if ai_cache is not None:
+        yield 'ai_cache_entries', 'gauge', 'Cached AI recommendations', len(ai_cache)
+        yield 'ai_cache_hits_total', 'counter', 'AI requests answered from the cache', ai_cache.hits
+        yield 'ai_cache_misses_total', 'counter', 'AI requests that needed the model', ai_cache.misses
+
+    audit_jobs = app.extensions.get('audit_jobs')
+    if audit_jobs is not None:
+        yield 'audit_cache_hits_total', 'counter', 'Audit uploads with an already parsed file', audit_jobs.cache.hits
+        yield 'audit_cache_misses_total', 'counter', 'Audit uploads that had to be parsed', audit_jobs.cache.misses
+
+    pool = app.extensions.get('db_pool_metrics')
+    if pool is not None:
+        stats = pool.snapshot()
+        if stats['size'] is not None:
+            yield 'db_pool_size', 'gauge', 'Connections the pool keeps open', stats['size']
+        yield 'db_pool_checked_out', 'gauge', 'Connections in use now', stats['checked_out']
+        yield 'db_pool_max_checked_out', 'gauge', 'Most connections in use at once', stats['max_checked_out']
+        yield 'db_pool_connects_total', 'counter', 'New database connections opened', stats['connects']
+        yield 'db_pool_checkouts_total', 'counter', 'Connections taken from the pool', stats['checkouts']
+        yield 'db_pool_invalidated_total', 'counter', 'Connections discarded after an error', stats['invalidated']
+
+
+def render_metrics(app) -> str:
+    lines = []
+    for name, kind, help_text, value in _counters(app):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+    metrics = app.extensions['request_metrics']
+    lines.extend(metrics.requests.render())
+    lines.extend(metrics.spans.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_span_started', []).append(time.perf_counter())
+
+
+def _on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('_span_started')
+    if started:
+        add_span('db', time.perf_counter() - started.pop())
+
+
+def _on_before_render(sender, template, context, **extra):
+    g.setdefault('_render_started', []).append(time.perf_counter())
+
+
+def _on_rendered(sender, template, context, **extra):
+    started = g.get('_render_started')
+    if started:
+        add_span('render', time.perf_counter() - started.pop())
+
+
+def init_app(app, db) -> None:
+    """Time requests, SQL and templates; serve /metrics if METRICS_TOKEN is set"""
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', _on_before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _on_after_cursor_execute)
+    before_render_template.connect(_on_before_render, app)
+    template_rendered.connect(_on_rendered, app)
+    send_header = app.config['SERVER_TIMING']
+    request_metrics = app.extensions['request_metrics'] = RequestMetrics()
+
+    @app.before_request
+    def start_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def record_timing(response):
+        started = g.get('_request_started')
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        spans = g.get('_spans') or {}
+        request_metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code, total, spans)
+        if send_header:
+            response.headers['Server-Timing'] = server_timing(spans, total)
+        return response
+
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        return
+
+    def metrics():
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+        return Response(render_metrics(app), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
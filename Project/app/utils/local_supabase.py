@@ -0,0 +1,296 @@
+"""
+A local stand-in for the Supabase client, backed by SQLite.
+
+It implements the part of the PostgREST query builder that app/super.py
+uses, in process:
+
+    client.table(name)
+        .select('*, author:user_id(id, name, email)')   columns and embeds
+        .insert(row or rows) / .update(values) / .delete()
+        .eq / .neq / .gt / .gte / .lt / .lte / .in_     filters
+        .order(column, desc=False) / .limit(n)
+        .execute()                                       -> .data (list of rows)
+
+Writes return the rows they wrote, as PostgREST does by default. An embed
+`alias:fk_column(columns)` (or `table(columns)`) follows the table's foreign
+key and attaches the referenced row, fetched with one query per request.
+
+Each execute() is one "request": it sleeps `latency` seconds, outside the
+database lock, standing in for the round trip to Supabase, and is counted,
+so caching and batching can be measured without the live service. The
+tables are created from the app's models if they don't exist, and the
+database may be the app's own SQLite file, as Supabase's Postgres is the app
+database in production. Set SUPABASE_LOCAL_DB (and SUPABASE_LOCAL_LATENCY_MS)
+to have super.get_client() return one.
+"""
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Boolean, DateTime, create_engine
+from sqlalchemy.pool import StaticPool
+
+_EMBED = re.compile(r'^(?:(\w+):)?(\w+)\((.*)\)$', re.DOTALL)
+_OPERATORS = {'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+
+
+class APIError(Exception):
+    """A request PostgREST would have rejected (the real client raises postgrest's APIError)"""
+
+
+@dataclass
+class APIResponse:
+    data: List[Dict[str, Any]]
+    count: Optional[int] = None
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Top-level comma-separated items of a select string (commas inside embeds don't split)"""
+    items, depth, current = [], 0, []
+    for char in columns:
+        if char == ',' and depth == 0:
+            items.append(''.join(current).strip())
+            current = []
+            continue
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        current.append(char)
+    items.append(''.join(current).strip())
+    return [item for item in items if item]
+
+
+@dataclass
+class _Embed:
+    alias: str
+    column: str        # foreign key column on this table
+    table: str         # referenced table
+    key: str           # referenced column
+    columns: List[str]
+
+
+class QueryBuilder:
+    def __init__(self, client: 'LocalClient', table: str):
+        self._client = client
+        self._table = table
+        self._method = 'select'
+        self._columns = '*'
+        self._values: Any = None
+        self._filters: List[tuple] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+
+    def select(self, columns: str = '*', count: Optional[str] = None) -> 'QueryBuilder':
+        self._method, self._columns = 'select', columns
+        return self
+
+    def insert(self, values) -> 'QueryBuilder':
+        self._method, self._values = 'insert', values
+        return self
+
+    def update(self, values: Dict[str, Any]) -> 'QueryBuilder':
+        self._method, self._values = 'update', values
+        return self
+
+    def delete(self) -> 'QueryBuilder':
+        self._method = 'delete'
+        return self
+
+    def _filter(self, column: str, operator: str, value) -> 'QueryBuilder':
+        self._filters.append((column, operator, value))
+        return self
+
+    def eq(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column: str, value) -> 'QueryBuilder':
+        return self._filter(column, 'lte', value)
+
+    def in_(self, column: str, values) -> 'QueryBuilder':
+        return self._filter(column, 'in', list(values))
+
+    def order(self, column: str, desc: bool = False) -> 'QueryBuilder':
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int) -> 'QueryBuilder':
+        self._limit = size
+        return self
+
+    def execute(self) -> APIResponse:
+        return self._client._execute(self)
+
+
+class LocalClient:
+    """Supabase-client look-alike over one SQLite database"""
+
+    def __init__(self, path: str = ':memory:', latency: float = 0.0, metadata=None):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+
+        if metadata is None:
+            from app.models import db
+            metadata = db.metadata
+        # Through this connection, so an in-memory database gets the tables too
+        metadata.create_all(create_engine('sqlite://', creator=lambda: self._connection, poolclass=StaticPool))
+        self._connection.row_factory = sqlite3.Row
+        self._booleans = {table.name: {c.name for c in table.columns if isinstance(c.type, Boolean)}
+                          for table in metadata.sorted_tables}
+        self._datetimes = {table.name: {c.name for c in table.columns if isinstance(c.type, DateTime)}
+                           for table in metadata.sorted_tables}
+
+    def table(self, name: str) -> QueryBuilder:
+        return QueryBuilder(self, name)
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.requests = 0
+
+    # ------------------------------------------------------------------
+
+    def _execute(self, query: QueryBuilder) -> APIResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            try:
+                rows = getattr(self, f'_{query._method}')(query)
+            except sqlite3.Error as e:
+                raise APIError(str(e)) from e
+        return APIResponse(data=[self._from_db(query._table, row) for row in rows])
+
+    def _select(self, query: QueryBuilder) -> List[Dict[str, Any]]:
+        columns, embeds = [], []
+        for item in _split_columns(query._columns):
+            match = _EMBED.match(item)
+            if match:
+                embeds.append(self._embed(query._table, *match.groups()))
+            else:
+                columns.append(item)
+        # The foreign keys embeds follow are needed even when not selected
+        hidden = [e.column for e in embeds if '*' not in columns and e.column not in columns]
+        select = ', '.join([_quote_column(c) for c in columns] + [_quote(c) for c in hidden])
+
+        where, params = self._where(query)
+        sql = f'SELECT {select} FROM {_quote(query._table)}{where}'
+        if query._order:
+            sql += ' ORDER BY ' + ', '.join(f"{_quote(c)} {'DESC' if desc else 'ASC'}" for c, desc in query._order)
+        if query._limit is not None:
+            sql += f' LIMIT {int(query._limit)}'
+        rows = [dict(row) for row in self._connection.execute(sql, params)]
+
+        for embed in embeds:
+            keys = sorted({row[embed.column] for row in rows if row[embed.column] is not None})
+            related = {}
+            if keys:
+                wanted = embed.columns if '*' not in embed.columns else ['*']
+                if '*' not in wanted and embed.key not in wanted:
+                    wanted = wanted + [embed.key]
+                placeholders = ', '.join('?' for _ in keys)
+                for row in self._connection.execute(
+                        f"SELECT {', '.join(_quote_column(c) for c in wanted)} FROM {_quote(embed.table)} "
+                        f"WHERE {_quote(embed.key)} IN ({placeholders})", keys):
+                    related[row[embed.key]] = self._from_db(embed.table, dict(row), embed.columns)
+            for row in rows:
+                row[embed.alias] = related.get(row[embed.column])
+        for row in rows:
+            for column in hidden:
+                del row[column]
+        return rows
+
+    def _insert(self, query: QueryBuilder) -> List[Dict[str, Any]]:
+        values = query._values if isinstance(query._values, list) else [query._values]
+        rows = []
+        for value in values:
+            value = self._to_db(query._table, value)
+            names = ', '.join(_quote(c) for c in value)
+            placeholders = ', '.join('?' for _ in value)
+            sql = f'INSERT INTO {_quote(query._table)} ({names}) VALUES ({placeholders}) RETURNING *'
+            rows.extend(dict(row) for row in self._connection.execute(sql, list(value.values())))
+        return rows
+
+    def _update(self, query: QueryBuilder) -> List[Dict[str, Any]]:
+        values = self._to_db(query._table, query._values)
+        assignments = ', '.join(f'{_quote(c)} = ?' for c in values)
+        where, params = self._where(query)
+        sql = f'UPDATE {_quote(query._table)} SET {assignments}{where} RETURNING *'
+        return [dict(row) for row in self._connection.execute(sql, list(values.values()) + params)]
+
+    def _delete(self, query: QueryBuilder) -> List[Dict[str, Any]]:
+        if not query._filters:
+            # PostgREST refuses unfiltered deletes too
+            raise APIError('DELETE requires a WHERE clause')
+        where, params = self._where(query)
+        return [dict(row) for row in self._connection.execute(
+            f'DELETE FROM {_quote(query._table)}{where} RETURNING *', params)]
+
+    def _where(self, query: QueryBuilder):
+        clauses, params = [], []
+        for column, operator, value in query._filters:
+            value = self._to_db(query._table, {column: value})[column] if operator != 'in' else value
+            if operator == 'in':
+                clauses.append(f"{_quote(column)} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            elif value is None and operator in ('eq', 'neq'):
+                clauses.append(f"{_quote(column)} IS {'NOT ' if operator == 'neq' else ''}NULL")
+            else:
+                clauses.append(f'{_quote(column)} {_OPERATORS[operator]} ?')
+                params.append(value)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _embed(self, table: str, alias: Optional[str], target: str, columns: str) -> _Embed:
+        wanted = [c.strip() for c in columns.split(',') if c.strip()]
+        for fk in self._connection.execute(f'PRAGMA foreign_key_list({_quote(table)})'):
+            if target in (fk['from'], fk['table']):
+                return _Embed(alias or target, fk['from'], fk['table'], fk['to'] or 'id', wanted)
+        raise APIError(f"Could not find a relationship between '{table}' and '{target}'")
+
+    def _to_db(self, table: str, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Timestamps in the format SQLAlchemy writes, so the app database can read them"""
+        datetimes = self._datetimes.get(table, ())
+        converted = {}
+        for column, value in values.items():
+            if column in datetimes and isinstance(value, str):
+                value = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+            if isinstance(value, datetime):
+                value = value.strftime('%Y-%m-%d %H:%M:%S.%f')
+            converted[column] = value
+        return converted
+
+    def _from_db(self, table: str, row: Dict[str, Any], columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        booleans = self._booleans.get(table, ())
+        datetimes = self._datetimes.get(table, ())
+        result = {}
+        for column, value in row.items():
+            if columns and '*' not in columns and column not in columns:
+                continue
+            if column in booleans and value is not None:
+                value = bool(value)
+            elif column in datetimes and isinstance(value, str):
+                value = value.replace(' ', 'T', 1)
+            result[column] = value
+        return result
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_column(name: str) -> str:
+    return '*' if name == '*' else _quote(name)
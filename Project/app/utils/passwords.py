@@ -0,0 +1,114 @@
+"""
+Password hashing with a work factor tuned to this host.
+
+Werkzeug's default PBKDF2 cost is a fixed 600,000 iterations, however fast
+or slow the machine is. At startup calibrate() times a short PBKDF2 run and
+picks the iteration count that takes PASSWORD_HASH_TARGET_MS here, clamped
+to PASSWORD_HASH_MIN/MAX_ITERATIONS (PASSWORD_HASH_ITERATIONS pins it and
+skips the benchmark). The minimum defaults to Werkzeug's own cost, so
+calibration can only make new hashes stronger, never weaker.
+
+Hashes are computed on a pool of PASSWORD_HASH_WORKERS threads (PBKDF2
+releases the GIL), and at most PASSWORD_HASH_QUEUE more may wait for one, so
+a burst of logins queues for the pool instead of tying up every web thread.
+Past that, PasswordHasherBusy is raised and the request is turned away.
+Hashes made with a lower cost, an older method or a short salt are re-hashed
+at the current cost the next time their owner logs in; stronger ones (and
+scrypt ones) are left alone.
+"""
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_PROBE_ITERATIONS = 20000
+_ROUND_TO = 10000
+# Werkzeug's salt length; older hashes with shorter salts are re-hashed
+_SALT_LENGTH = 16
+
+
+class PasswordHasherBusy(Exception):
+    """Too many hashes queued already"""
+
+
+def calibrate(target_ms: float, min_iterations: int, max_iterations: int) -> int:
+    """PBKDF2-SHA256 iterations that take about target_ms on this machine"""
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac('sha256', b'calibrate', b'0123456789abcdef', _PROBE_ITERATIONS)
+        best = min(best, time.perf_counter() - start)
+    iterations = int(_PROBE_ITERATIONS * (target_ms / 1000) / best) // _ROUND_TO * _ROUND_TO
+    return max(min_iterations, min(max_iterations, iterations))
+
+
+def _iterations(password_hash: str) -> Optional[int]:
+    """Iteration count of a 'pbkdf2:sha256:N$salt$hash' hash, None for anything else"""
+    method, _, rest = password_hash.partition('$')
+    method = method.split(':')
+    salt = rest.partition('$')[0]
+    if len(salt) < _SALT_LENGTH:
+        return None
+    if len(method) == 3 and method[:2] == ['pbkdf2', 'sha256'] and method[2].isdigit():
+        return int(method[2])
+    return None
+
+
+class PasswordHasher:
+    def __init__(self, iterations: int, workers: int = 2, max_queued: int = 32, timeout: float = 10.0):
+        self.iterations = iterations
+        self.method = f'pbkdf2:sha256:{iterations}'
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_queued)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Released when the hash is done, not when we stop waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        if not password_hash:
+            return False
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        iterations = _iterations(password_hash)
+        if password_hash.startswith('scrypt:'):
+            # Memory-hard already; nothing to gain from PBKDF2
+            return False
+        return iterations is None or iterations < self.iterations
+
+
+def init_app(app) -> None:
+    iterations = app.config['PASSWORD_HASH_ITERATIONS']
+    if not iterations:
+        iterations = calibrate(
+            app.config['PASSWORD_HASH_TARGET_MS'],
+            app.config['PASSWORD_HASH_MIN_ITERATIONS'],
+            app.config['PASSWORD_HASH_MAX_ITERATIONS'],
+        )
+        app.logger.info('Password hashing: %d PBKDF2 iterations (~%d ms)',
+                        iterations, app.config['PASSWORD_HASH_TARGET_MS'])
+    app.extensions['passwords'] = PasswordHasher(
+        iterations,
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queued=app.config['PASSWORD_HASH_QUEUE'],
+    )
@@ -1,92 +1,299 @@
-import PyPDF2
+import io
 import re
-from typing import Dict, Any
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, Future
+from itertools import islice
+from typing import Dict, Any, Deque, Iterator, List, Optional, Set, Tuple
+
+from app.utils.gened_index import CATEGORY_FLAGS, SUBCATEGORY_FLAGS, load_gened_index
+
+# Bump when parsing changes, so cached audit results are recomputed
+PARSER_VERSION = 2
+
+# Statuses an audit prints next to a requirement
+_STATUSES = {'OK', 'COMPLETE', 'NEEDS', 'NO'}
+_QR_STATUSES = _STATUSES | {'IP'}
+
+# Requirement header -> (requirements key, statuses it recognizes, statuses
+# that count as satisfied). A status word the requirement doesn't recognize
+# (IP for most of them) is skipped, and the next one after the header decides.
+REQUIREMENT_HEADERS = {
+    'UNIVERSITY COMPOSITION I REQUIREMENT': ('composition1', _STATUSES, {'OK', 'COMPLETE'}),
+    'ADVANCED COMPOSITION': ('advanced_composition', _STATUSES, {'OK', 'COMPLETE'}),
+    'QUANTITATIVE REASONING I': ('quantitative_reasoning1', _QR_STATUSES, {'OK', 'COMPLETE', 'IP'}),
+    'QUANTITATIVE REASONING II': ('quantitative_reasoning2', _QR_STATUSES, {'OK', 'COMPLETE', 'IP'}),
+    'WESTERN/COMPARATIVE CULTURE': ('western_culture', _STATUSES, {'OK', 'COMPLETE'}),
+    'NON-WESTERN CULTURE': ('non_western_culture', _STATUSES, {'OK', 'COMPLETE'}),
+    'U.S. MINORITY CULTURE': ('us_minority_culture', _STATUSES, {'OK', 'COMPLETE'}),
+    'LANGUAGE REQUIREMENT': ('language_requirement', _STATUSES, {'OK', 'COMPLETE'}),
+}
+
+# A course line: term, subject, number, credit hours and grade, as in
+# 'FA22 CS 124  3.0  A-  Intro Computer Science I'
+_COURSE_LINE = re.compile(r'\b(?:FA|SP|SU|WI)\d{2}\s+([A-Z]{2,4})\s*(\d{3})\s+\d+(?:\.\d+)?\s+([A-Z]{1,3}[+-]?)(?!\S)')
+
+# Grades that mean a course counts; IP is in progress, anything else (F, W,
+# NR, ...) doesn't count
+COMPLETED_GRADES = frozenset({
+    'A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'C-', 'D+', 'D', 'D-',
+    'PS', 'CR', 'S', 'TR',
+})
+IN_PROGRESS_GRADES = frozenset({'IP'})
+
+# Every UserRequirements flag the parser sets
+REQUIREMENT_FLAGS = (
+    [key for key, _, _ in REQUIREMENT_HEADERS.values()] + list(CATEGORY_FLAGS) + sorted(SUBCATEGORY_FLAGS)
+)
+
+
+# Every token the scanner cares about as one literal alternation, longest
+# first so 'QUANTITATIVE REASONING II' wins over its prefix. Plain literals
+# keep the regex engine's per-character work small; word boundaries for
+# status words are checked on the (few) matches instead.
+_AUDIT_TOKEN = re.compile('|'.join(
+    re.escape(token)
+    for token in sorted({*REQUIREMENT_HEADERS, *_QR_STATUSES}, key=len, reverse=True)
+))
+# The text is uppercased a window at a time rather than all at once, so an
+# audit decided on its first page doesn't pay for copying the rest. Windows
+# overlap by the longest token, so a token starting in one fits in it whole.
+_SCAN_WINDOW = 16384
+_WINDOW_OVERLAP = max(map(len, {*REQUIREMENT_HEADERS, *_QR_STATUSES}))
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class AuditScanner:
+    """
+    Reads every requirement's status from audit text in a single pass.
+
+    A requirement is decided by the first status word after its first
+    header. Headers waiting for a status are kept in a small pending map,
+    so each status word settles all of them at once. Text can be fed a page
+    at a time (pending headers carry over), and feed() reports when there
+    is nothing left to find so the caller can stop reading.
+    """
+
+    def __init__(self):
+        self.results: Dict[str, bool] = {}
+        self._pending: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self._remaining = len(REQUIREMENT_HEADERS)
+
+    @property
+    def done(self) -> bool:
+        return not self._remaining
+
+    def feed(self, text: str) -> bool:
+        """Scan the next piece of the audit; True once everything is decided"""
+        end_of_text = len(text)
+        results, pending = self.results, self._pending
+
+        position = 0
+        while self._remaining and position < end_of_text:
+            # Matches must start before window_end; the overlap only completes them
+            offset = position
+            window_end = offset + _SCAN_WINDOW
+            upper = text[offset:window_end + _WINDOW_OVERLAP].upper()
+            while self._remaining:
+                match = _AUDIT_TOKEN.search(upper, position - offset)
+                if match is None or offset + match.start() >= window_end:
+                    break
+                token, start, end = match.group(), offset + match.start(), offset + match.end()
+                # A rejected match may overlap a real token, so only skip one character
+                position = start + 1
+
+                if token in _QR_STATUSES:
+                    if (start and _is_word_char(text[start - 1])) or (end < end_of_text and _is_word_char(text[end])):
+                        continue
+                    for key, (recognized, satisfied) in list(pending.items()):
+                        if token in recognized:
+                            results[key] = token in satisfied
+                            del pending[key]
+                            self._remaining -= 1
+                else:
+                    key, recognized, satisfied = REQUIREMENT_HEADERS[token]
+                    if key not in results and key not in pending:
+                        pending[key] = (recognized, satisfied)
+                position = end
+            position = max(position, window_end)
+        return self.done
+
+    def result(self) -> Dict[str, bool]:
+        """Everything decided so far, with anything undecided as False"""
+        results = dict(self.results)
+        for key, _, _ in REQUIREMENT_HEADERS.values():
+            results.setdefault(key, False)
+        return results
+
+
+def parse_audit_text(text: str) -> Dict[str, bool]:
+    """Every requirement's printed status from the full audit text"""
+    scanner = AuditScanner()
+    scanner.feed(text)
+    return scanner.result()
+
+
+def extract_courses(text: str) -> Iterator[Tuple[str, str]]:
+    """(course code, 'completed' or 'in_progress') for each course line that counts"""
+    for subject, number, grade in _COURSE_LINE.findall(text):
+        if grade in COMPLETED_GRADES:
+            yield f"{subject} {number}", 'completed'
+        elif grade in IN_PROGRESS_GRADES:
+            yield f"{subject} {number}", 'in_progress'
+
+
+def _pdf_reader(source):
+    # PyPDF2 is imported on first use rather than with the web app
+    from PyPDF2 import PdfReader
+    return PdfReader(source)
+
+
+def count_pages(source) -> int:
+    """Number of pages in a PDF, given as a path"""
+    try:
+        return len(_pdf_reader(source).pages)
+    except Exception as e:
+        raise Exception(f"Error reading PDF: {str(e)}")
+
+
+def extract_page_range(source, start: int, stop: int) -> List[str]:
+    """
+    Text of pages [start, stop) of a PDF, given as a path or its bytes.
+
+    Module-level so it can run in a process pool; each call opens the PDF
+    itself.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    pdf_reader = _pdf_reader(source)
+    return [pdf_reader.pages[number].extract_text() or "" for number in range(start, min(stop, len(pdf_reader.pages)))]
+
 
 class DegreeAuditParser:
-    def __init__(self, pdf_file):
+    def __init__(self, pdf_file, text: Optional[str] = None):
         self.pdf_file = pdf_file
-        self.text = self._extract_text()
+        self._text = text
         self.requirements = {}
-    
-    def _extract_text(self) -> str:
-        """Extract text from PDF file"""
-        text = ""
+        # Course code -> 'completed' or 'in_progress', from the last parse_requirements()
+        self.courses: Dict[str, str] = {}
+        # Pages actually extracted by the last parse_requirements()
+        self.pages_read = 0
+
+    @classmethod
+    def from_text(cls, text: str) -> 'DegreeAuditParser':
+        """Parser over already extracted audit text"""
+        return cls(None, text=text)
+
+    @property
+    def text(self) -> str:
+        """The full audit text, extracted on first use"""
+        if self._text is None:
+            self._text = self._extract_text()
+        return self._text
+
+    def iter_pages(self) -> Iterator[str]:
+        """Text of each page, extracted as it's asked for"""
         try:
-            pdf_reader = PyPDF2.PdfReader(self.pdf_file)
+            pdf_reader = _pdf_reader(self.pdf_file)
             for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+                yield page.extract_text() or ""
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
-        return text
-    
-    def parse_requirements(self) -> Dict[str, Any]:
-        """Parse all requirements from the degree audit text"""
-        self._parse_composition()
-        self._parse_quantitative_reasoning()
-        self._parse_cultural_studies()
-        self._parse_language_requirement()
-        self._parse_general_education()
+
+    def iter_pages_parallel(self, executor: Executor, batch_size: int = 4, window: int = 4) -> Iterator[str]:
+        """
+        Text of each page in order, extracted in page ranges on executor.
+
+        At most window batches are in flight, so a caller that stops early
+        leaves little work behind, and batches that haven't started yet are
+        cancelled when the iterator is closed.
+        """
+        source = self.pdf_file
+        if not isinstance(source, str):
+            source.seek(0)
+            source = source.read()
+        try:
+            page_count = len(_pdf_reader(source if isinstance(source, str) else io.BytesIO(source)).pages)
+        except Exception as e:
+            raise Exception(f"Error reading PDF: {str(e)}")
+
+        # Only a first batch_size pages go out at first: most audits are
+        # decided on their first pages. The rest is split into about two
+        # tasks per worker (each task re-opens the PDF, so not too many),
+        # and the window fills once the caller wants more.
+        rest = max(batch_size, -(-(page_count - batch_size) // (2 * window)))
+        ranges = iter([(0, batch_size)] + [(start, start + rest) for start in range(batch_size, page_count, rest)])
+        in_flight: Deque[Future] = deque()
+
+        def submit(count: int) -> None:
+            for start, stop in islice(ranges, count):
+                in_flight.append(executor.submit(extract_page_range, source, start, stop))
+
+        try:
+            submit(1)
+            while in_flight:
+                batch = in_flight.popleft()
+                try:
+                    pages = batch.result()
+                except BrokenExecutor:
+                    raise
+                except Exception as e:
+                    raise Exception(f"Error reading PDF: {str(e)}")
+                yield from pages
+                submit(window - len(in_flight))
+        finally:
+            for batch in in_flight:
+                batch.cancel()
+
+    def _extract_text(self) -> str:
+        """Extract text from PDF file"""
+        return "".join(f"{page}\n" for page in self.iter_pages())
+
+    def parse_requirements(self, executor: Optional[Executor] = None, batch_size: int = 4, window: int = 4) -> Dict[str, Any]:
+        """
+        Parse all requirements from the degree audit.
+
+        A requirement status printed in the audit is taken as is. Everything
+        else (the gen-ed categories, and any requirement the audit doesn't
+        mention) comes from the completed and in-progress courses it lists,
+        resolved against the catalog's gen-ed index. Pages are pulled lazily
+        (from executor when given); since courses only ever add coverage,
+        reading stops once every status is printed and every subcategory
+        is covered.
+        """
+        index = load_gened_index()
+        scanner = AuditScanner()
+        covered: Set[str] = set()
+        self.courses = {}
+        self.pages_read = 0
+
+        def feed(text: str) -> bool:
+            for code, status in extract_courses(text):
+                if self.courses.get(code) != 'completed':
+                    self.courses[code] = status
+                covered.update(index.flags.get(code, ()))
+            return scanner.feed(text) and SUBCATEGORY_FLAGS <= covered
+
+        if self._text is not None:
+            feed(self._text)
+        else:
+            if executor is not None:
+                pages = self.iter_pages_parallel(executor, batch_size, window)
+            else:
+                pages = self.iter_pages()
+            try:
+                for page in pages:
+                    self.pages_read += 1
+                    if feed(f"{page}\n"):
+                        break
+            finally:
+                pages.close()
+
+        # One set-algebra pass over everything the courses cover
+        covered = index.flags_for(self.courses)
+        printed = scanner.results
+        for key in REQUIREMENT_FLAGS:
+            self.requirements[key] = printed[key] if key in printed else key in covered
         return self.requirements
-    
-    def _parse_composition(self):
-        """Parse composition requirements"""
-        # UNIVERSITY COMPOSITION I REQUIREMENT
-        comp1_pattern = r'UNIVERSITY COMPOSITION I REQUIREMENT.*?(OK|COMPLETE|NEEDS|NO)'
-        comp1_match = re.search(comp1_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['composition1'] = comp1_match.group(1) in ['OK', 'COMPLETE'] if comp1_match else False
-        
-        # ADVANCED COMPOSITION
-        adv_comp_pattern = r'ADVANCED COMPOSITION.*?(OK|COMPLETE|NEEDS|NO)'
-        adv_comp_match = re.search(adv_comp_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['advanced_composition'] = adv_comp_match.group(1) in ['OK', 'COMPLETE'] if adv_comp_match else False
-    
-    def _parse_quantitative_reasoning(self):
-        """Parse quantitative reasoning requirements"""
-        # QUANTITATIVE REASONING I
-        qr1_pattern = r'QUANTITATIVE REASONING I.*?(OK|COMPLETE|IP|NEEDS|NO)'
-        qr1_match = re.search(qr1_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['quantitative_reasoning1'] = qr1_match.group(1) in ['OK', 'COMPLETE', 'IP'] if qr1_match else False
-        
-        # QUANTITATIVE REASONING II
-        qr2_pattern = r'QUANTITATIVE REASONING II.*?(OK|COMPLETE|IP|NEEDS|NO)'
-        qr2_match = re.search(qr2_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['quantitative_reasoning2'] = qr2_match.group(1) in ['OK', 'COMPLETE', 'IP'] if qr2_match else False
-    
-    def _parse_cultural_studies(self):
-        """Parse cultural studies requirements"""
-        # WESTERN/COMPARATIVE CULTURE(S)
-        western_pattern = r'WESTERN/COMPARATIVE CULTURE.*?(OK|COMPLETE|NEEDS|NO)'
-        western_match = re.search(western_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['western_culture'] = western_match.group(1) in ['OK', 'COMPLETE'] if western_match else False
-        
-        # NON-WESTERN CULTURE(S)
-        non_western_pattern = r'NON-WESTERN CULTURE.*?(OK|COMPLETE|NEEDS|NO)'
-        non_western_match = re.search(non_western_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['non_western_culture'] = non_western_match.group(1) in ['OK', 'COMPLETE'] if non_western_match else False
-        
-        # U.S. MINORITY CULTURE(S)
-        us_minority_pattern = r'U\.S\. MINORITY CULTURE.*?(OK|COMPLETE|NEEDS|NO)'
-        us_minority_match = re.search(us_minority_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['us_minority_culture'] = us_minority_match.group(1) in ['OK', 'COMPLETE'] if us_minority_match else False
-    
-    def _parse_language_requirement(self):
-        """Parse language requirement"""
-        language_pattern = r'LANGUAGE REQUIREMENT.*?(OK|COMPLETE|NEEDS|NO)'
-        language_match = re.search(language_pattern, self.text, re.IGNORECASE | re.DOTALL)
-        self.requirements['language_requirement'] = language_match.group(1) in ['OK', 'COMPLETE'] if language_match else False
-    
-    def _parse_general_education(self):
-        """Parse general education categories"""
-        # For simplicity, we'll set these based on course completion patterns
-        # In a real implementation, you'd parse the specific course lists
-        self.requirements['humanities_arts'] = 'HUMANITIES AND THE ARTS' in self.text
-        self.requirements['social_behavioral'] = 'SOCIAL AND BEHAVIORAL SCIENCE' in self.text
-        self.requirements['natural_sciences'] = 'NATURAL SCIENCES AND TECHNOLOGY' in self.text
-        
-        # Set subcategories to True for now (you can enhance parsing as needed)
-        self.requirements['humanities_hp'] = True
-        self.requirements['humanities_la'] = True
-        self.requirements['social_behavioral_bsc'] = True
-        self.requirements['social_behavioral_ss'] = True
-        self.requirements['natural_sciences_ls'] = True
-        self.requirements['natural_sciences_ps'] = True
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+On-demand sampling profiler for a running worker.
+
+GET /admin/profile?seconds=10 samples the stack of every thread in the
+worker that serves it, every interval_ms (10 by default), for that many
+seconds, and returns the stacks in the collapsed format flame graph tools
+read (flamegraph.pl, speedscope, inferno):
+
+    app/routes.py:api_courses:164;app/utils/course_search.py:scores:280 57
+
+Only stacks that are running app code count, so idle server threads
+waiting for a connection don't drown out the requests; all_threads=1 keeps
+everything. Nothing runs until a profile is asked for, so leaving it
+enabled costs nothing, and one profile runs at a time per worker (a second
+request gets 409). The request that asks for the profile holds its worker
+for the whole run, and with several worker processes it only sees the one
+it lands on.
+
+It is for the accounts whose ids are listed in ADMIN_USER_IDS (ids, not
+emails, since users can change their own email); with none listed the
+endpoint doesn't exist (404). seconds is capped at PROFILER_MAX_SECONDS.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Tuple
+
+from flask import Response, abort, request
+from flask_login import current_user, login_required
+
+APP_DIR = str(Path(__file__).resolve().parent.parent)
+ROOT_DIR = str(Path(APP_DIR).parent)
+
+
+class StackSampler:
+    def __init__(self):
+        self._busy = threading.Lock()
+        self._labels: Dict[object, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if filename.startswith(ROOT_DIR):
+                filename = filename[len(ROOT_DIR) + 1:]
+            elif 'site-packages' in filename:
+                filename = filename.rpartition('site-packages')[2].lstrip('/\\')
+            # The collapsed format separates frames with ';' and the count with a space
+            label = f'{filename}:{code.co_name}:{code.co_firstlineno}'.replace(';', ':').replace(' ', '_')
+            self._labels[code] = label
+        return label
+
+    def sample(self, seconds: float, interval: float, all_threads: bool = False) -> Tuple[Counter, int]:
+        """Collapsed stack -> samples, and the number of sampling rounds"""
+        if not self._busy.acquire(blocking=False):
+            raise RuntimeError('A profile is already running')
+        try:
+            stacks: Counter = Counter()
+            own_thread = threading.get_ident()
+            rounds = 0
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    codes = []
+                    in_app = all_threads
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        in_app = in_app or frame.f_code.co_filename.startswith(APP_DIR)
+                        frame = frame.f_back
+                    if in_app:
+                        stacks[';'.join(self._label(code) for code in reversed(codes))] += 1
+                rounds += 1
+                time.sleep(interval)
+            return stacks, rounds
+        finally:
+            self._busy.release()
+
+
+def collapse(stacks: Counter) -> str:
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+def init_app(app) -> None:
+    admins = {int(user_id) for user_id in app.config['ADMIN_USER_IDS'].split(',') if user_id.strip()}
+    if not admins:
+        return
+    sampler = app.extensions['profiler'] = StackSampler()
+
+    @login_required
+    def profile():
+        if current_user.id not in admins:
+            abort(403)
+        seconds = min(max(request.args.get('seconds', default=10, type=float), 0.1),
+                      app.config['PROFILER_MAX_SECONDS'])
+        interval = min(max(request.args.get('interval_ms', default=10, type=float), 1), 1000) / 1000
+        all_threads = request.args.get('all_threads') == '1'
+        try:
+            stacks, rounds = sampler.sample(seconds, interval, all_threads)
+        except RuntimeError as e:
+            return Response(f'{e}\n', status=409, mimetype='text/plain')
+        response = Response(collapse(stacks), mimetype='text/plain')
+        response.headers['X-Profile-Seconds'] = f'{seconds:g}'
+        response.headers['X-Profile-Rounds'] = str(rounds)
+        response.headers['X-Profile-Samples'] = str(sum(stacks.values()))
+        return response
+
+    app.add_url_rule('/admin/profile', 'admin_profile', profile)
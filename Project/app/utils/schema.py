@@ -0,0 +1,94 @@
+"""
+Startup schema handling.
+
+Tables are created and changed by migrations (flask --app run db upgrade),
+not when a worker boots. At startup DB_SCHEMA decides what happens:
+
+    auto    create for in-memory SQLite (tests and benchmarks) and for a
+            SQLite file with no tables yet (a fresh checkout's first run),
+            check for anything else; the default
+    check   compare the database's Alembic stamp with the migrations' head
+            (one SELECT) and warn if it's behind
+    create  db.create_all() and stamp head, for throwaway databases
+    skip    nothing
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.utils.db_engine import is_memory_sqlite
+
+MIGRATIONS_DIR = str(Path(__file__).resolve().parent.parent.parent / 'migrations')
+# The revisions whose schema a db.create_all() database from before migrations
+# has: the initial one, or the audit job table's if it was created after that
+# table was added
+INITIAL_REVISION = 'dec475884d38'
+AUDIT_JOB_REVISION = '4f2a9c1e7b30'
+
+
+@lru_cache(maxsize=None)
+def migration_heads(directory: str = MIGRATIONS_DIR) -> Tuple[str, ...]:
+    return tuple(ScriptDirectory(directory).get_heads())
+
+
+def current_revision(engine) -> Optional[str]:
+    """The database's stamped revision, None if it has never been stamped"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def unmigrated_revision(engine) -> str:
+    """The revision to stamp an unstamped db.create_all() database at before upgrading"""
+    return AUDIT_JOB_REVISION if inspect(engine).has_table('audit_job') else INITIAL_REVISION
+
+
+def schema_problem(engine, directory: str = MIGRATIONS_DIR) -> Optional[str]:
+    """Why the database isn't at the migrations' head, None if it is"""
+    heads = migration_heads(directory)
+    revision = current_revision(engine)
+    if revision in heads:
+        return None
+    if revision is None:
+        return ("Database has no migration stamp. Run 'flask --app run db upgrade' from the Project directory "
+                "(if its tables came from db.create_all(), "
+                f"'flask --app run db stamp {unmigrated_revision(engine)}' first).")
+    return (f"Database is at migration {revision}, code expects {', '.join(heads)}. "
+            "Run 'flask --app run db upgrade' from the Project directory.")
+
+
+def is_fresh_sqlite(engine) -> bool:
+    """A SQLite database with no tables at all (such as a file that doesn't exist yet)"""
+    if engine.url.get_backend_name() != 'sqlite':
+        return False
+    return is_memory_sqlite(engine.url) or not inspect(engine).get_table_names()
+
+
+def create_schema(db, directory: str = MIGRATIONS_DIR) -> None:
+    """Create every table as the models define them, stamped as fully migrated"""
+    db.create_all()
+    with db.engine.begin() as connection:
+        MigrationContext.configure(connection).stamp(ScriptDirectory(directory), 'head')
+
+
+def init_app(app, db) -> None:
+    mode = app.config['DB_SCHEMA']
+    if mode == 'skip':
+        return
+    with app.app_context():
+        if mode == 'auto' and is_fresh_sqlite(db.engine):
+            app.logger.info('Creating tables in the new database %s', db.engine.url)
+            mode = 'create'
+        if mode == 'create':
+            create_schema(db)
+            return
+        problem = schema_problem(db.engine)
+        if problem:
+            app.logger.warning(problem)
@@ -0,0 +1,202 @@
+"""
+One place to look users up, create them and save changes to them.
+
+The app database is the source of truth for accounts (Supabase's `user`
+table is the same table, so there is no second lookup to keep in sync).
+Users are cached by id as UserPrincipal objects: the row's column values in
+a __slots__ object that Flask-Login uses as current_user, so load_user
+doesn't query (or touch the session) on an authenticated request. Entries
+expire after USER_CACHE_TTL seconds (30 by default), which bounds how long
+another worker process can show pages to a user deleted or deactivated
+elsewhere; changes made in this process go through save/delete here and
+drop the entry at once.
+
+Views that write on the user's behalf don't trust the cache at all: with
+@live_user_required they re-read the row first (one primary key SELECT)
+and answer 401, logging the session out, if the account is gone or
+deactivated, so no rows are written for a deleted user.
+
+Credentials are never cached: principals don't hold the password hash (a
+User attached from one loads it from the row when it's read), and
+get_by_email, which logins go through, always selects the current row, so
+a password change or deactivation in another worker applies at once.
+"""
+import threading
+from functools import wraps
+from typing import Dict, Optional
+
+from flask import abort, current_app
+from flask_login import current_user, logout_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.models import User, db
+from app.utils.response_cache import TTLCache
+
+# Everything but the password hash, which is read from the row when needed
+_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != 'password_hash')
+
+
+class UserPrincipal:
+    """Read-only copy of a User row, used as current_user"""
+
+    __slots__ = _COLUMNS + ('has_password',)
+
+    # Flask-Login (is_active is a column)
+    is_authenticated = True
+    is_anonymous = False
+
+    # Same helpers as User
+    is_illinois_email = User.is_illinois_email
+    netid = User.netid
+
+    def __init__(self, user: User):
+        for key in _COLUMNS:
+            setattr(self, key, getattr(user, key))
+        self.has_password = bool(user.has_password)
+
+    def get_id(self) -> str:
+        return str(self.id)
+
+    def to_user(self) -> User:
+        """A detached User with the same values (password hash not loaded), ready to merge into a session"""
+        user = User(**{key: getattr(self, key) for key in _COLUMNS})
+        make_transient_to_detached(user)
+        return user
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, (UserPrincipal, User)) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<UserPrincipal {self.email}>'
+
+
+class UserRepository:
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self._principals = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def _remember(self, user: User) -> UserPrincipal:
+        principal = UserPrincipal(user)
+        self._principals.set(principal.id, principal)
+        return principal
+
+    def _attach(self, principal: UserPrincipal) -> User:
+        # load=False trusts the cached values instead of re-reading the row
+        return db.session.merge(principal.to_user(), load=False)
+
+    def principal(self, user_id: int) -> Optional[UserPrincipal]:
+        """The user for Flask-Login; only queries on a cache miss"""
+        principal = self._principals.get(user_id)
+        if principal is not None:
+            return principal
+        user = db.session.get(User, user_id)
+        return self._remember(user) if user else None
+
+    def get(self, user_id: int) -> Optional[User]:
+        """The user as a session-bound User, for changing or deleting it"""
+        principal = self._principals.get(user_id)
+        if principal is not None:
+            return self._attach(principal)
+        user = db.session.get(User, user_id)
+        if user:
+            self._remember(user)
+        return user
+
+    def live(self, user_id: int) -> Optional[User]:
+        """
+        The user's current row, for a write made on their behalf.
+
+        Always queries; None (and the cache entry dropped) if the account
+        was deleted or deactivated, possibly by another worker.
+        """
+        user = db.session.get(User, user_id, populate_existing=True)
+        if user is None or user.is_active is False:
+            self.forget(user_id)
+            return None
+        self._remember(user)
+        return user
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        """
+        The current row for an email, for checking credentials.
+
+        Always queries (one SELECT), so the password hash and is_active are
+        never older than the database; the cache entry is refreshed from it.
+        """
+        user = User.query.filter_by(email=email.lower()).first()
+        if user:
+            self._remember(user)
+        return user
+
+    def create(self, name: str, email: str, password_hash: str = '') -> Optional[User]:
+        """
+        Insert a new user and return it, or None if the email is taken.
+
+        The unique index on email does the existence check, so registering
+        is a single INSERT.
+        """
+        user = User(name=name, email=email.lower(), password_hash=password_hash)
+        db.session.add(user)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return None
+        # Cache before the commit expires the attributes (and they'd be re-read)
+        user_id = self._remember(user).id
+        db.session.commit()
+        return self.get(user_id)
+
+    def save(self, user: User) -> None:
+        """Commit changes to a user and refresh its cache entry"""
+        self.forget(user.id)
+        db.session.flush()
+        self._remember(user)
+        try:
+            db.session.commit()
+        except Exception:
+            self.forget(user.id)
+            raise
+
+    def delete(self, user: User) -> None:
+        """Delete a user (not committed) and drop it from the cache"""
+        self.forget(user.id)
+        db.session.delete(user)
+
+    def forget(self, user_id: int) -> None:
+        if self._principals.pop(user_id) is not None:
+            with self._lock:
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Cache counters for lookups by id"""
+        hits, misses = self._principals.hits, self._principals.misses
+        return {
+            'size': len(self._principals),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'invalidations': self.invalidations,
+        }
+
+
+def live_user_required(view):
+    """Below @login_required: 401 (and logged out) unless the account still exists and is active"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_app.extensions['users'].live(current_user.id) is None:
+            logout_user()
+            abort(401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app) -> None:
+    app.extensions['users'] = UserRepository(
+        maxsize=app.config['USER_CACHE_SIZE'], ttl=app.config['USER_CACHE_TTL']
+    )
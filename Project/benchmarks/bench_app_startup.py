@@ -0,0 +1,105 @@
+"""
+create_app() time with the schema created on boot vs. checked against the
+Alembic stamp.
+
+    create_all  what every worker used to do: db.create_all(), which checks
+                each table exists (and would create missing ones)
+    check       the default now: one SELECT of alembic_version compared with
+                the migrations' head
+
+The database is migrated to head first. Each variant builds the app
+--repeat times in this process (so imports aren't counted; each app gets a
+new engine and connects again) and reports the median and the number of SQL
+statements startup sent. On a local SQLite file a statement costs next to
+nothing, so each variant is also run with --latency-ms added per statement,
+standing in for the round trip to a hosted database; or use --database-url
+to point at a real server.
+
+Run from the Project directory:
+    python benchmarks/bench_app_startup.py [--repeat 20] [--latency-ms 20] [--database-url postgresql://...]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+# Calibrating the password hash cost isn't what's measured here
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+
+from flask_migrate import upgrade  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.models import db  # noqa: E402
+from app.utils.schema import MIGRATIONS_DIR  # noqa: E402
+
+statements = []
+latency = {'seconds': 0.0}
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count(conn, cursor, statement, *args):
+    statements.append(statement)
+    if latency['seconds']:
+        time.sleep(latency['seconds'])
+
+
+def create_all_variant(url):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'DB_SCHEMA': 'skip'})
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def check_variant(url):
+    return create_app({'SQLALCHEMY_DATABASE_URI': url, 'DB_SCHEMA': 'check'})
+
+
+def measure(build, url, repeat):
+    timings, counts = [], []
+    for _ in range(repeat):
+        statements.clear()
+        start = time.perf_counter()
+        app = build(url)
+        timings.append((time.perf_counter() - start) * 1000)
+        counts.append(len(statements))
+        with app.app_context():
+            db.engine.dispose()
+    return statistics.median(timings), statistics.median(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=20, help='simulated round trip per statement')
+    parser.add_argument('--database-url', help='an existing database to migrate and use (default: a temporary SQLite file)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        url = args.database_url or f"sqlite:///{os.path.join(directory, 'startup.db')}"
+        app = create_app({'SQLALCHEMY_DATABASE_URI': url, 'DB_SCHEMA': 'skip'})
+        with app.app_context():
+            upgrade(MIGRATIONS_DIR)
+            db.engine.dispose()
+
+        print(f"{'variant':<12} {'latency':>8} {'median ms':>10} {'statements':>11}")
+        for delay in sorted({0.0, args.latency_ms}):
+            latency['seconds'] = delay / 1000
+            results = {}
+            for name, build in (('create_all', create_all_variant), ('check', check_variant)):
+                results[name] = measure(build, url, args.repeat)
+                print(f"{name:<12} {delay:>6.0f}ms {results[name][0]:>10.2f} {results[name][1]:>11.0f}")
+            print(f"{'':<12} {'':>8} {results['create_all'][0] - results['check'][0]:>+10.2f} saved by check")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Latency and memory of degree audit PDF extraction.
+
+Renders synthetic audits (see bench_audit_parser.py) to PDFs of 50+ pages
+and parses each three ways:
+
+    eager     extract every page, then parse (the old behaviour)
+    lazy      pull pages one at a time and stop once everything is decided
+    worker    lazy, in one process pool worker (how audit jobs run it)
+    parallel  lazy, with pages extracted in batches on a process pool
+              (audit jobs only do this above AUDIT_PARALLEL_PAGES)
+
+'full' audits print every requirement status and list a course for every
+gen-ed subcategory on the first page, so lazy reading stops almost
+immediately; 'sparse' audits leave requirements out, so every variant has
+to read the whole file. Memory is the peak traced in
+this process (the pool's workers aren't included).
+
+Run from the Project directory:
+    python benchmarks/bench_audit_extraction.py [--pages 50 100 200] [--workers 4]
+"""
+import argparse
+import io
+import multiprocessing
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.gened_index import SUBCATEGORY_FLAGS, load_gened_index  # noqa: E402
+from app.utils.pdf_parser import DegreeAuditParser  # noqa: E402
+from bench_audit_parser import LINES_PER_PAGE, build_audit_text  # noqa: E402
+
+
+def render_pdf(text):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    lines = text.splitlines()
+    for start in range(0, len(lines), LINES_PER_PAGE):
+        y = 760
+        for line in lines[start:start + LINES_PER_PAGE]:
+            pdf.drawString(36, y, line)
+            y -= 13
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def gened_courses():
+    """One catalog course for each gen-ed subcategory"""
+    index = load_gened_index()
+    return [
+        min(code for code, flags in index.flags.items() if flag in flags)
+        for flag in sorted(SUBCATEGORY_FLAGS)
+    ]
+
+
+def eager(data):
+    parser = DegreeAuditParser.from_text(DegreeAuditParser(io.BytesIO(data)).text)
+    return parser.parse_requirements(), None
+
+
+def lazy(data):
+    parser = DegreeAuditParser(io.BytesIO(data))
+    return parser.parse_requirements(), parser.pages_read
+
+
+def parse_in_worker(data):
+    return lazy(data)
+
+
+def worker(executor):
+    def run(data):
+        return executor.submit(parse_in_worker, data).result()
+    return run
+
+
+def parallel(executor, workers, batch_size):
+    def run(data):
+        parser = DegreeAuditParser(io.BytesIO(data))
+        return parser.parse_requirements(executor=executor, batch_size=batch_size, window=workers), parser.pages_read
+    return run
+
+
+def measure(fn, data, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result, pages_read = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / (1024 * 1024), result, pages_read
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=4, help='pages per parallel task')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=196)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    courses = gened_courses()
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context('spawn'))
+    start = time.perf_counter()
+    list(executor.map(abs, range(args.workers)))
+    print(f"process pool: {args.workers} workers started in {(time.perf_counter() - start) * 1000:.0f} ms (not counted below)")
+
+    mismatches = 0
+    print(f"{'audit':<13} {'pdf':>7} {'variant':<9} {'ms':>9} {'peak MB':>8} {'pages read':>11}")
+    try:
+        for variant in ('full', 'sparse'):
+            for pages in args.pages:
+                sparse = variant == 'sparse'
+                data = render_pdf(build_audit_text(pages, rng, sparse=sparse, gened_courses=() if sparse else courses))
+                expected = None
+                variants = (('eager', eager), ('lazy', lazy), ('worker', worker(executor)),
+                            ('parallel', parallel(executor, args.workers, args.batch)))
+                for name, fn in variants:
+                    ms, peak, result, pages_read = measure(fn, data, args.repeat)
+                    if expected is None:
+                        expected = result
+                    elif result != expected:
+                        mismatches += 1
+                        print(f"MISMATCH: {name} on {variant} {pages}p")
+                    print(f"{variant + ' ' + str(pages) + 'p':<13} {len(data) / 1024:>5.0f}KB {name:<9} {ms:>9.1f} "
+                          f"{peak:>8.2f} {pages_read if pages_read is not None else pages:>11}")
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    if mismatches:
+        print(f"FAIL: variants disagreed {mismatches} times")
+        return 1
+    print("OK: all variants agree")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
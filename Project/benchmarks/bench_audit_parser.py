@@ -0,0 +1,135 @@
+"""
+Benchmark of the single-pass degree-audit parser against the old one.
+
+Builds synthetic audit text of growing size (requirement sections followed
+by pages of course history) and times parse_audit_text against the separate
+DOTALL search per requirement the parser used to run. In the 'full' variant
+everything is decided near the top and the new parser stops there; the
+'sparse' variant leaves some requirements and gen-ed headings out, so both
+parsers have to read to the end. Both parsers must agree on every audit.
+
+Run from the Project directory:
+    python benchmarks/bench_audit_parser.py [--pages 1 10 100 1000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.pdf_parser import REQUIREMENT_HEADERS, parse_audit_text  # noqa: E402
+
+SUBJECTS = ('CS', 'MATH', 'STAT', 'RHET', 'PHYS', 'ECON', 'PSYC', 'HIST', 'ENGL', 'SPAN')
+# The old parser also matched status words inside other words ('no' in
+# 'economics'), so titles avoid them to keep the comparison meaningful
+TITLES = (
+    'Introduction to Computer Science', 'Data Structures', 'Calculus II', 'Linear Algebra',
+    'Writing and Research', 'University Physics: Mechanics', 'Intermediate Microtheory',
+    'Intro Experimental Psych', 'History of the World to 1500', 'Elementary Spanish',
+)
+TERMS = ('FA21', 'SP22', 'SU22', 'FA22', 'SP23', 'FA23', 'SP24')
+GRADES = ('A+', 'A', 'A-', 'B+', 'B', 'B-', 'C+', 'C', 'PS', 'IP')
+GENED_HEADINGS = ('HUMANITIES AND THE ARTS', 'SOCIAL AND BEHAVIORAL SCIENCE', 'NATURAL SCIENCES AND TECHNOLOGY')
+LINES_PER_PAGE = 55
+
+
+def course_line(rng):
+    return (f"   {rng.choice(TERMS)} {rng.choice(SUBJECTS)} {rng.randint(100, 499)}"
+            f"  {rng.choice(('3.0', '4.0', '1.0'))}  {rng.choice(GRADES):<3} {rng.choice(TITLES)}")
+
+
+def build_audit_text(pages, rng, sparse=False, gened_courses=()):
+    """
+    Audit text with every requirement section up front, then course history.
+
+    gened_courses (codes like 'HIST 100') are listed as completed under the
+    gen-ed headings.
+    """
+    lines = ['UNIVERSITY OF ILLINOIS URBANA-CHAMPAIGN', 'ACADEMIC REQUIREMENTS REPORT', '']
+    headers = list(REQUIREMENT_HEADERS)
+    headings = list(GENED_HEADINGS)
+    if sparse:
+        headers = headers[::2]
+        headings = headings[:1]
+    for header in headers:
+        lines.append(f"{rng.choice(('OK', 'NO'))}  {header}")
+        lines.append(f"    {rng.choice(('COMPLETE', 'NEEDS', 'IP'))}:  1 COURSE")
+        lines.extend(course_line(rng) for _ in range(rng.randint(1, 4)))
+    for heading in headings:
+        lines.append(f"{rng.choice(('OK', 'NO'))}  {heading}")
+        lines.extend(course_line(rng) for _ in range(rng.randint(2, 6)))
+    for code in gened_courses:
+        lines.append(f"   {rng.choice(TERMS)} {code}  3.0  A   General Education Course")
+    while len(lines) < pages * LINES_PER_PAGE:
+        lines.append(course_line(rng))
+    return '\n'.join(lines) + '\n'
+
+
+def legacy_parse(text):
+    """
+    The previous DegreeAuditParser.parse_requirements, one search per requirement.
+
+    (It also guessed the gen-ed categories from their headings; those now
+    come from the course list, so they aren't compared here.)
+    """
+    requirements = {}
+    for pattern, key, satisfied in (
+        (r'UNIVERSITY COMPOSITION I REQUIREMENT.*?(OK|COMPLETE|NEEDS|NO)', 'composition1', ('OK', 'COMPLETE')),
+        (r'ADVANCED COMPOSITION.*?(OK|COMPLETE|NEEDS|NO)', 'advanced_composition', ('OK', 'COMPLETE')),
+        (r'QUANTITATIVE REASONING I.*?(OK|COMPLETE|IP|NEEDS|NO)', 'quantitative_reasoning1', ('OK', 'COMPLETE', 'IP')),
+        (r'QUANTITATIVE REASONING II.*?(OK|COMPLETE|IP|NEEDS|NO)', 'quantitative_reasoning2', ('OK', 'COMPLETE', 'IP')),
+        (r'WESTERN/COMPARATIVE CULTURE.*?(OK|COMPLETE|NEEDS|NO)', 'western_culture', ('OK', 'COMPLETE')),
+        (r'NON-WESTERN CULTURE.*?(OK|COMPLETE|NEEDS|NO)', 'non_western_culture', ('OK', 'COMPLETE')),
+        (r'U\.S\. MINORITY CULTURE.*?(OK|COMPLETE|NEEDS|NO)', 'us_minority_culture', ('OK', 'COMPLETE')),
+        (r'LANGUAGE REQUIREMENT.*?(OK|COMPLETE|NEEDS|NO)', 'language_requirement', ('OK', 'COMPLETE')),
+    ):
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        requirements[key] = match.group(1) in satisfied if match else False
+    return requirements
+
+
+def best_of(fn, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=196)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mismatches = 0
+    print(f"{'audit':<14} {'size':>9} {'old ms':>9} {'new ms':>9} {'speedup':>8} {'new us/KB':>10}")
+    for variant in ('full', 'sparse'):
+        for pages in args.pages:
+            text = build_audit_text(pages, rng, sparse=variant == 'sparse')
+            old_ms, old = best_of(legacy_parse, text, args.repeat)
+            new_ms, new = best_of(parse_audit_text, text, args.repeat)
+            if old != new:
+                mismatches += 1
+                diff = sorted(key for key in old if old[key] != new.get(key))
+                print(f"MISMATCH on {variant} {pages}p: {', '.join(diff)}")
+            size_kb = len(text) / 1024
+            print(f"{variant + ' ' + str(pages) + 'p':<14} {size_kb:>7.0f}KB {old_ms:>9.3f} {new_ms:>9.3f} "
+                  f"{old_ms / new_ms if new_ms else float('inf'):>7.1f}x {new_ms * 1000 / size_kb:>10.2f}")
+
+    if mismatches:
+        print(f"FAIL: parsers disagreed on {mismatches} audits")
+        return 1
+    print("OK: parsers agree on every audit")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
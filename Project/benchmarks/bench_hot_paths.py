@@ -0,0 +1,225 @@
+"""
+Micro-benchmarks of the catalog, GPA and audit parser hot paths at 1x, 10x
+and 100x today's data, compared with stored baselines.
+
+Cases (each timed at every --scales factor):
+
+    load_courses          routes._load_courses() from a cold cache (CSV parse)
+    courses_meta          GET /api/courses/meta
+    api_courses_search    GET /api/courses?q=... (index scoring and ranking)
+    api_courses_filter    GET /api/courses?major=...&geneds=... (filtering only)
+    course_gpa_stats      get_course_gpa_stats() for one course
+    section_gpa           calculate_section_gpa() over every section
+    parse_requirements    DegreeAuditParser.parse_requirements() on audit text
+                          that has to be read to the end
+
+The catalog at N x is the real one plus N-1 renamed copies of every course
+(so there are N times the departments too). The GPA data is synthetic,
+10000 sections at 1x (the real gpa_data.csv isn't in the repo). Audits are
+4 pages at 1x. The search index takes about 80 MB per 1x of catalog, so
+api_courses_search stops at --search-max-scale (10x) unless it's raised on
+a machine with the memory for it. Each case is run for at least --min-time
+seconds (at least once) after an untimed warm-up call, and reports the
+median per call (per request for the two /api/courses cases).
+
+Next to each result are its growth over the previous scale (the scaling
+curve: 10.0x per 10x is linear) and its baseline. Baselines are kept in
+benchmarks/baselines/hot_paths.json, in ms per case and scale; a run fails
+if any case is more than --tolerance times its baseline, and --save records
+the run as the new baseline. Baselines are only comparable on the machine
+that recorded them (and a busy machine can be 1.5x slower across the
+board, hence the default tolerance of 2), so save them again after changing
+machines.
+
+Run from the Project directory:
+    python benchmarks/bench_hot_paths.py [--scales 1 10 100] [--cases load_courses ...] [--save]
+"""
+import argparse
+import csv
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+# The GPA module resolves its data path relative to the working directory
+os.chdir(PROJECT_ROOT)
+
+from app import create_app, routes  # noqa: E402
+from app.utils import gpa_calculator  # noqa: E402
+from app.utils.pdf_parser import DegreeAuditParser  # noqa: E402
+from bench_audit_parser import build_audit_text  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baselines' / 'hot_paths.json'
+CATALOG_PATH = PROJECT_ROOT / 'app' / 'all_courses.csv'
+FIELDS = ('course_code', 'course_name', 'credit_hours', 'department', 'gen_ed_requirements', 'description')
+GRADES = tuple(gpa_calculator.GRADE_VALUES)
+GPA_SECTIONS = 10000
+AUDIT_PAGES = 4
+TERMS = [f'{year}-{term}' for year in range(2012, 2025) for term in ('sp', 'su', 'fa')]
+INSTRUCTORS = [f'Instructor, {chr(65 + i // 26)}{chr(65 + i % 26)}' for i in range(400)]
+# Cases that send several requests per call
+PER_CALL = {'api_courses_search': 20, 'api_courses_filter': 20}
+
+
+def copy_suffix(copy):
+    """Letters appended to a subject for the copy-th copy of the catalog"""
+    return chr(65 + copy // 26) + chr(65 + copy % 26)
+
+
+def write_catalog(path, scale):
+    with CATALOG_PATH.open('r', encoding='utf-8-sig', newline='') as handle:
+        rows = list(csv.DictReader(handle))
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        for copy in range(1, scale):
+            suffix = copy_suffix(copy)
+            for row in rows:
+                subject, _, number = row['course_code'].partition(' ')
+                writer.writerow(dict(row, course_code=f'{subject}{suffix} {number}',
+                                     department=f"{row['department']} {suffix}"))
+    return rows
+
+
+def write_gpa_data(path, scale, codes, rng):
+    fieldnames = ['YearTerm', 'Subject', 'Number', 'Course Title', 'Primary Instructor', 'Students', *GRADES, 'W']
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=fieldnames)
+        writer.writeheader()
+        for _ in range(GPA_SECTIONS * scale):
+            subject, number = rng.choice(codes).split(' ')
+            counts = {grade: rng.randint(0, 12) for grade in GRADES}
+            writer.writerow(dict(counts, YearTerm=rng.choice(TERMS), Subject=subject, Number=number,
+                                 **{'Course Title': 'Synthetic', 'Primary Instructor': rng.choice(INSTRUCTORS),
+                                    'Students': sum(counts.values()), 'W': rng.randint(0, 3)}))
+
+
+def reset_caches():
+    for cached in (routes._load_courses, routes._search_index, routes._catalog_index,
+                   routes._course_retriever, routes._requirement_index,
+                   gpa_calculator.load_gpa_data, gpa_calculator.load_course_gpas):
+        cached.cache_clear()
+    gc.collect()
+
+
+def measure(fn, min_time):
+    """Median seconds per call over as many calls as fit in min_time (at least one)"""
+    fn()
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while not timings or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(timings)
+
+
+def cases(client, scale, rng, catalog_rows):
+    """{name: zero-argument callable} for one scale; data files are in place"""
+    departments = sorted({row['department'] for row in catalog_rows if row['department']})
+    words = [word for row in catalog_rows for word in row['course_name'].split() if len(word) > 3]
+    queries = rng.sample(words, 20)
+    filters = [{'major': rng.choice(departments), 'geneds': 'HUM'} for _ in range(20)]
+    gpa_code = f"{rng.choice(catalog_rows)['course_code']}"
+    audit = build_audit_text(AUDIT_PAGES * scale, rng, sparse=True)
+
+    def api(params):
+        def call():
+            for query in params:
+                response = client.get('/api/courses', query_string=query)
+                assert response.status_code == 200
+        return call
+
+    def section_gpa():
+        for row in gpa_calculator.load_gpa_data():
+            gpa_calculator.calculate_section_gpa(row)
+
+    return {
+        'load_courses': lambda: (routes._load_courses.cache_clear(), routes._load_courses()),
+        'courses_meta': lambda: client.get('/api/courses/meta'),
+        'api_courses_search': api([{'q': query} for query in queries]),
+        'api_courses_filter': api(filters),
+        'course_gpa_stats': lambda: gpa_calculator.get_course_gpa_stats(gpa_code),
+        'section_gpa': section_gpa,
+        'parse_requirements': lambda: DegreeAuditParser.from_text(audit).parse_requirements(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--cases', nargs='+', help='only these cases')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per case and scale')
+    parser.add_argument('--tolerance', type=float, default=2.0, help='fail if slower than baseline x this')
+    parser.add_argument('--search-max-scale', type=int, default=10,
+                        help='largest scale to build the search index at (it needs ~80 MB per 1x)')
+    parser.add_argument('--seed', type=int, default=14)
+    parser.add_argument('--save', action='store_true', help='store this run as the baseline')
+    args = parser.parse_args()
+
+    baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    results = {}
+    regressions = []
+    # Each case's ms at the previous scale, for the growth column
+    last = {}
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'PASSWORD_HASH_ITERATIONS': 1000})
+    client = app.test_client()
+
+    print(f"{'case':<20} {'scale':>5} {'ms/call':>10} {'calls':>6} {'growth':>7} {'baseline':>10} {'change':>7}")
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            rng = random.Random(args.seed)
+            catalog = os.path.join(directory, f'catalog_{scale}.csv')
+            gpa_data = os.path.join(directory, f'gpa_{scale}.csv')
+            catalog_rows = write_catalog(catalog, scale)
+            write_gpa_data(gpa_data, scale, [row['course_code'] for row in catalog_rows], rng)
+            routes.DATA_PATH = Path(catalog)
+            gpa_calculator.GPA_DATA_PATH = Path(gpa_data)
+            reset_caches()
+
+            for name, fn in cases(client, scale, rng, catalog_rows).items():
+                if args.cases and name not in args.cases:
+                    continue
+                if name == 'api_courses_search' and scale > args.search_max_scale:
+                    print(f"{name:<20} {scale:>4}x {'skipped, see --search-max-scale':>37}")
+                    continue
+                seconds, calls = measure(fn, args.min_time)
+                ms = seconds * 1000 / PER_CALL.get(name, 1)
+                key = f'{name}@{scale}x'
+                results[key] = round(ms, 4)
+                previous = last.get(name)
+                last[name] = ms
+                growth = f'{ms / previous:.1f}x' if previous else '-'
+                baseline = baselines.get(key)
+                change = f'{ms / baseline:.2f}x' if baseline else '-'
+                print(f"{name:<20} {scale:>4}x {ms:>10.3f} {calls:>6} {growth:>7} "
+                      f"{baseline if baseline else '-':>10} {change:>7}")
+                if baseline and ms > baseline * args.tolerance:
+                    regressions.append(f'{key}: {ms:.3f} ms vs baseline {baseline:.3f} ms')
+
+            # Release this scale's data before building the next one
+            os.remove(catalog)
+            os.remove(gpa_data)
+            reset_caches()
+
+    if args.save:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        BASELINE_PATH.write_text(json.dumps(dict(baselines, **results), indent=2, sort_keys=True) + '\n')
+        print(f"\nSaved {len(results)} baselines to {BASELINE_PATH.relative_to(PROJECT_ROOT)}")
+    for regression in regressions:
+        print(f"\nFAIL: {regression}")
+    return 1 if regressions and not args.save else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Import time of the web app, from `python -X importtime`.
+
+Imports app.routes (everything a worker loads before serving) in fresh
+interpreters --repeat times and prints the median total and the slowest
+modules of the last run. It fails if any of DEFERRED is imported at startup:
+those SDKs are only imported when the feature that needs them is first used,
+and an eager import of one costs every worker and every `flask` CLI command
+(google.genai alone is most of a second).
+
+Run from the Project directory:
+    python benchmarks/bench_import_time.py [--repeat 5] [--top 15] [--budget-ms 1000]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEFERRED = ('google.genai', 'google.oauth2', 'google.auth', 'requests', 'supabase', 'PyPDF2')
+
+
+def import_times(module):
+    """{module: (self us, cumulative us)} for one fresh interpreter"""
+    env = dict(os.environ, SUPABASE_URL=os.environ.get('SUPABASE_URL', 'http://localhost'),
+               SUPABASE_KEY=os.environ.get('SUPABASE_KEY', 'benchmark'))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.routes')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, help='fail if the median import takes longer')
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.repeat):
+        times = import_times(args.module)
+        # Cumulative time of the module itself includes everything it imports
+        totals.append(times[args.module][1] / 1000)
+
+    print(f"import {args.module}: median {statistics.median(totals):.0f} ms "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}) over {args.repeat} runs\n")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    failed = False
+    eager = [name for name in DEFERRED if name in times]
+    if eager:
+        failed = True
+        print(f"\nFAIL: imported at startup, should be deferred to first use: {', '.join(eager)}")
+    if args.budget_ms and statistics.median(totals) > args.budget_ms:
+        failed = True
+        print(f"\nFAIL: median import time over the {args.budget_ms:.0f} ms budget")
+    if not failed:
+        print(f"\nOK: none of {', '.join(DEFERRED)} imported at startup")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""
+End-to-end load test of the web app with a realistic mix of requests.
+
+Boots create_app() on a temporary SQLite database, with the local Supabase
+stand-in (app/utils/local_supabase.py) on the same file adding --latency-ms
+to every Supabase request, and the fake AI backend. --users virtual users
+each register, log in with their own client and then, for --duration
+seconds, pick requests from MIX by weight:
+
+    search        GET /api/courses, as the catalog page in app.js sends it
+                  (a query, a department, gen-ed filters or a mix)
+    meta          GET /api/courses/meta, once per catalog page load
+    course        GET /course/<code>
+    chat_poll     GET /api/messages/<code>, course_detail.html polls it
+    chat_send     POST /api/messages/<code>
+    review        POST /course/<code>/review (a redirect once reviewed)
+    audit_upload  POST /upload_audit with a rendered audit PDF
+    audit_status  GET /api/audit-status, the dashboard polls it
+    assistant     POST /api/ai-assistant
+
+Requests run in this process, through Flask test clients on one thread per
+user, so the numbers are the app's own time (no HTTP server or network in
+between). It prints throughput and p50/p95/p99 latency per endpoint and
+exits non-zero if any request failed with a 5xx or an exception, or if an
+endpoint's p95 is over --max-p95-ms. --json writes the results to a file
+for comparing runs.
+
+Run from the Project directory:
+    python benchmarks/bench_load.py [--users 8] [--duration 20] [--latency-ms 20] [--json results.json]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+from app import create_app  # noqa: E402
+from app import super as sb  # noqa: E402
+from app.utils.local_supabase import LocalClient  # noqa: E402
+from bench_audit_extraction import gened_courses, render_pdf  # noqa: E402
+from bench_audit_parser import build_audit_text  # noqa: E402
+
+# Relative weights, roughly what a browsing session sends: chat polling and
+# catalog searches dominate, writes are rare
+MIX = {
+    'search': 30,
+    'meta': 4,
+    'course': 14,
+    'chat_poll': 30,
+    'chat_send': 5,
+    'review': 3,
+    'audit_upload': 1,
+    'audit_status': 8,
+    'assistant': 5,
+}
+
+MAJORS = ('Computer Science', 'Mathematics', 'Economics', 'Psychology', 'Undeclared')
+INTERESTS = ('machine learning', 'writing', 'history', 'statistics', 'music', 'biology')
+
+
+class Workload:
+    """The catalog-derived inputs the virtual users draw from"""
+
+    def __init__(self, courses, rng, audits):
+        self.courses = courses
+        # Chat and reviews concentrate on popular courses
+        self.popular = [course['course_code'] for course in rng.sample(courses, min(50, len(courses)))]
+        self.departments = sorted({course['department'] for course in courses if course['department']})
+        self.geneds = sorted({part.strip() for course in courses
+                              for part in course['gen_ed_requirements'].replace(';', ',').split(',') if part.strip()})
+        words = [word for course in courses for word in course['course_name'].split() if len(word) > 3]
+        self.queries = (
+            [course['course_code'] for course in rng.sample(courses, 200)]
+            + [course['course_code'].replace(' ', '').lower() for course in rng.sample(courses, 100)]
+            + rng.sample(words, 200)
+            + [word[:3].lower() for word in rng.sample(words, 100)]
+        )
+        self.audits = audits
+
+    def search_params(self, rng):
+        params = {'limit': rng.choice((30, 30, 60))}
+        kind = rng.random()
+        if kind < 0.6:
+            params['q'] = rng.choice(self.queries)
+        if kind > 0.4:
+            params['major'] = rng.choice(self.departments)
+        if rng.random() < 0.2:
+            params['geneds'] = ','.join(rng.sample(self.geneds, rng.randint(1, 2)))
+        return params
+
+
+def review_form(rng):
+    return {
+        'rating': str(rng.randint(1, 5)),
+        'difficulty': str(rng.randint(1, 5)),
+        'workload': str(rng.randint(1, 5)),
+        'title': 'Load test review',
+        'comment': 'A synthetic review written by the load test, long enough to pass validation.',
+        'semester_taken': '',
+        'grade_received': '',
+        'professor': '',
+    }
+
+
+def request(client, name, workload, rng):
+    """Send one request of the given kind; returns the response"""
+    if name == 'search':
+        return client.get('/api/courses', query_string=workload.search_params(rng))
+    if name == 'meta':
+        return client.get('/api/courses/meta')
+    if name == 'course':
+        code = rng.choice(workload.popular) if rng.random() < 0.7 else rng.choice(workload.courses)['course_code']
+        return client.get(f'/course/{code}')
+    if name == 'chat_poll':
+        return client.get(f'/api/messages/{rng.choice(workload.popular)}')
+    if name == 'chat_send':
+        return client.post(f'/api/messages/{rng.choice(workload.popular)}',
+                           json={'content': f'load test message {rng.random():.6f}'})
+    if name == 'review':
+        return client.post(f'/course/{rng.choice(workload.popular)}/review', data=review_form(rng))
+    if name == 'audit_upload':
+        data = {'audit_file': (io.BytesIO(rng.choice(workload.audits)), 'audit.pdf')}
+        return client.post('/upload_audit', data=data, content_type='multipart/form-data')
+    if name == 'audit_status':
+        return client.get('/api/audit-status')
+    if name == 'assistant':
+        return client.post('/api/ai-assistant', json={
+            'major': rng.choice(MAJORS),
+            'goals': f'I am interested in {rng.choice(INTERESTS)}',
+            'priorities': rng.sample(('easy', 'interesting', 'useful', 'geneds'), 2),
+        })
+    raise ValueError(name)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def add(self, name, seconds, error=None):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            if error:
+                self.errors[name] += 1
+                self.error_samples.setdefault(name, error)
+
+
+def virtual_user(app, workload, number, seed, recorder, start, deadline, warmup):
+    rng = random.Random(seed * 1000 + number)
+    client = app.test_client()
+    email = f'load{number}@illinois.edu'
+    client.post('/register', data={'name': f'Load User {number}', 'email': email,
+                                   'password': 'loadtest1', 'confirm_password': 'loadtest1'})
+    names, weights = zip(*MIX.items())
+
+    # Untimed: loads the catalog and indexes, and warms this user's caches
+    for name in names[:warmup]:
+        request(client, name, workload, rng)
+    start.wait()
+
+    while time.perf_counter() < deadline[0]:
+        name = rng.choices(names, weights)[0]
+        began = time.perf_counter()
+        try:
+            response = request(client, name, workload, rng)
+            error = f'HTTP {response.status_code}' if response.status_code >= 500 else None
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        recorder.add(name, time.perf_counter() - began, error)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    rows = {}
+    everything = []
+    for name in MIX:
+        values = sorted(recorder.latencies.get(name, []))
+        everything.extend(values)
+        rows[name] = values
+    rows['all'] = sorted(everything)
+    results = {}
+    for name, values in rows.items():
+        errors = sum(recorder.errors.values()) if name == 'all' else recorder.errors.get(name, 0)
+        results[name] = {
+            'requests': len(values),
+            'errors': errors,
+            'rps': len(values) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': (values[-1] if values else 0.0) * 1000,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20, help='seconds of timed load')
+    parser.add_argument('--latency-ms', type=float, default=20, help='added to every Supabase request')
+    parser.add_argument('--ai-delay-ms', type=float, default=200, help='fake model latency')
+    parser.add_argument('--audit-queue', default='process', choices=('process', 'inline'))
+    parser.add_argument('--seed', type=int, default=14)
+    parser.add_argument('--max-p95-ms', type=float, help='fail if any endpoint is slower at p95')
+    parser.add_argument('--json', help='write the results here')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'load.db')
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}',
+            'DB_SCHEMA': 'create',
+            'DATA_STORE': 'supabase',
+            'WTF_CSRF_ENABLED': False,
+            'AI_BACKEND': 'fake',
+            'AUDIT_QUEUE': args.audit_queue,
+            'AUDIT_UPLOAD_DIR': os.path.join(directory, 'uploads'),
+            'AUDIT_CACHE_DIR': os.path.join(directory, 'audit_cache'),
+            # Calibrating the password hash cost isn't what's measured here
+            'PASSWORD_HASH_ITERATIONS': 1000,
+        })
+        app.extensions['ai_backend'].delay = args.ai_delay_ms / 1000
+        sb.set_client(LocalClient(database, latency=args.latency_ms / 1000))
+
+        from app.routes import _load_courses
+        courses = _load_courses()
+        codes = gened_courses()
+        audits = [render_pdf(build_audit_text(rng.randint(1, 3), rng, sparse=i % 2 == 1, gened_courses=codes[:i]))
+                  for i in range(8)]
+        workload = Workload(courses, rng, audits)
+
+        recorder = Recorder()
+        start = threading.Barrier(args.users + 1)
+        deadline = [float('inf')]
+        threads = [
+            threading.Thread(target=virtual_user, daemon=True,
+                             args=(app, workload, number, args.seed, recorder, start, deadline, len(MIX)))
+            for number in range(args.users)
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        deadline[0] = began + args.duration
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+
+        results = summarize(recorder, elapsed)
+
+    print(f"{args.users} users for {elapsed:.1f} s, Supabase latency {args.latency_ms:.0f} ms, "
+          f"AI latency {args.ai_delay_ms:.0f} ms\n")
+    print(f"{'endpoint':<13} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8}")
+    for name, row in results.items():
+        print(f"{name:<13} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump({'args': vars(args), 'elapsed': elapsed, 'endpoints': results}, handle, indent=2)
+
+    failed = False
+    for name, sample in recorder.error_samples.items():
+        failed = True
+        print(f"\nFAIL: {recorder.errors[name]} {name} requests failed, e.g. {sample}")
+    if args.max_p95_ms:
+        for name, row in results.items():
+            if name != 'all' and row['p95_ms'] > args.max_p95_ms:
+                failed = True
+                print(f"\nFAIL: {name} p95 {row['p95_ms']:.1f} ms is over {args.max_p95_ms:.0f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
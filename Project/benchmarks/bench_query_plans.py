@@ -0,0 +1,142 @@
+"""
+Query plans and latency of the hot review/chat queries, before and after the
+"Indexes for hot query shapes" migration.
+
+Seeds a throwaway SQLite database, downgrades it to the initial revision,
+then for each query shape prints SQLite's EXPLAIN QUERY PLAN and the mean
+time per query over random courses/users, upgrades to head and does the
+same. The queries are built with the ORM the way the app (and Supabase's
+equivalent filters) issue them:
+
+    my review      review WHERE user_id = ? AND course_code = ?
+    course reviews review WHERE course_code = ? AND is_approved ORDER BY created_at DESC
+    course chat    message WHERE course_code = ? AND NOT is_deleted ORDER BY created_at DESC LIMIT 100
+
+Run from the Project directory:
+    python benchmarks/bench_query_plans.py [--users 2000] [--reviews 50000] [--messages 200000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('PASSWORD_HASH_ITERATIONS', '1000')
+
+from flask_migrate import downgrade, upgrade  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.models import Message, Review, User, db  # noqa: E402
+
+INITIAL_REVISION = 'dec475884d38'
+MIGRATIONS = str(PROJECT_ROOT / 'migrations')
+
+
+def seed(users, reviews, messages, courses, rng):
+    start = datetime(2024, 1, 1)
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'email': f'user{i}@illinois.edu', 'name': f'User {i}', 'password_hash': ''}
+        for i in range(1, users + 1)
+    ])
+    pairs = set()
+    while len(pairs) < reviews:
+        pairs.add((rng.randint(1, users), rng.choice(courses)))
+    db.session.execute(Review.__table__.insert(), [
+        {'user_id': user_id, 'course_code': course, 'rating': 4, 'difficulty': 3, 'workload': 3,
+         'title': 'Review', 'comment': 'Comment', 'is_approved': rng.random() > 0.05, 'is_flagged': False,
+         'created_at': start + timedelta(minutes=rng.randint(0, 10 ** 6))}
+        for user_id, course in pairs
+    ])
+    # Chat is concentrated in a few popular courses
+    weights = [1 / (rank + 1) for rank in range(len(courses))]
+    db.session.execute(Message.__table__.insert(), [
+        {'user_id': rng.randint(1, users), 'course_code': course, 'content': 'Hello',
+         'is_deleted': rng.random() < 0.02, 'is_flagged': False,
+         'created_at': start + timedelta(seconds=rng.randint(0, 10 ** 8))}
+        for course in rng.choices(courses, weights=weights, k=messages)
+    ])
+    db.session.commit()
+
+
+# name -> query for a given course and user, as the routes build them
+SHAPES = (
+    ('my review', lambda course, user_id: Review.query.filter_by(user_id=user_id, course_code=course).limit(1)),
+    ('course reviews', lambda course, user_id: Review.query.filter_by(course_code=course, is_approved=True)
+        .order_by(Review.created_at.desc())),
+    ('course chat', lambda course, user_id: Message.query.filter_by(course_code=course, is_deleted=False)
+        .order_by(Message.created_at.desc()).limit(100)),
+)
+
+
+def explain(query):
+    compiled = query.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {compiled}')).fetchall()
+    return '; '.join(row[-1] for row in rows)
+
+
+def run(label, courses, users, iterations, seed):
+    print(f"\n== {label}")
+    # Same courses and users in the same order for both schemas
+    rng = random.Random(seed)
+    timings = {}
+    for name, build in SHAPES:
+        print(f"{name:<15} {explain(build(courses[0], 1))}")
+        # Chat traffic goes to the popular courses
+        pool = courses[:20] if name == 'course chat' else courses
+        start = time.perf_counter()
+        for _ in range(iterations):
+            build(rng.choice(pool), rng.randint(1, users)).all()
+            db.session.expunge_all()
+        timings[name] = (time.perf_counter() - start) / iterations * 1000
+    for name, ms in timings.items():
+        print(f"{name:<15} {ms:8.3f} ms/query")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--messages', type=int, default=200000)
+    parser.add_argument('--courses', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=196)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    courses = [f'CS {100 + i}' for i in range(args.courses)]
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(directory, 'bench.db')}", 'DB_SCHEMA': 'create'})
+        with app.app_context():
+            downgrade(MIGRATIONS, INITIAL_REVISION)
+            start = time.perf_counter()
+            seed(args.users, args.reviews, args.messages, courses, rng)
+            print(f"seeded {args.users} users, {args.reviews} reviews, {args.messages} messages "
+                  f"in {time.perf_counter() - start:.1f} s")
+            db.session.execute(text('ANALYZE'))
+
+            before = run('initial schema', courses, args.users, args.iterations, args.seed)
+            start = time.perf_counter()
+            upgrade(MIGRATIONS)
+            db.session.execute(text('ANALYZE'))
+            print(f"\nmigrated to head in {time.perf_counter() - start:.1f} s")
+            after = run('with hot query indexes', courses, args.users, args.iterations, args.seed)
+            db.session.remove()
+            db.engine.dispose()
+
+    print()
+    for name in before:
+        print(f"{name:<15} {before[name] / after[name]:6.1f}x faster")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Latency benchmark for the course search index.
+
+Replays queries derived from the whole catalog (codes typed with and without
+the space, names, typed prefixes, words with a typo, one to three letter
+fragments, and stopwords alone or in phrases) and reports the latency
+percentiles of CourseSearchIndex.search, and the slowest queries. Exits non-zero if p99 is
+over the budget.
+
+Run from the Project directory:
+    python benchmarks/bench_search.py [--budget-ms 5] [--queries 3000]
+"""
+import argparse
+import csv
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from app.utils.course_search import CourseSearchIndex  # noqa: E402
+
+DATA_PATH = PROJECT_ROOT / 'app' / 'all_courses.csv'
+STOPWORDS = ('the', 'and', 'of', 'in', 'to', 'for', 'a', 'an', 'with')
+FIELDS = ('course_code', 'course_name', 'credit_hours', 'department', 'gen_ed_requirements', 'description')
+
+
+def load_courses():
+    with DATA_PATH.open('r', encoding='utf-8-sig', newline='') as handle:
+        return [
+            {field: (row.get(field) or '').strip() for field in FIELDS}
+            for row in csv.DictReader(handle)
+        ]
+
+
+def add_typo(word, rng):
+    """Swap, drop or replace one letter"""
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(('swap', 'drop', 'replace'))
+    if kind == 'swap':
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if kind == 'drop':
+        return word[:i] + word[i + 1:]
+    return word[:i] + rng.choice('aeiourst') + word[i + 1:]
+
+
+def build_queries(courses, count, rng):
+    queries = []
+    while len(queries) < count:
+        course = rng.choice(courses)
+        code = course['course_code']
+        name = course['course_name']
+        words = [word for word in name.split() if len(word) > 3]
+        kind = rng.randrange(8)
+        if kind == 0:
+            queries.append(code)
+        elif kind == 1:
+            queries.append(code.replace(' ', '').lower())
+        elif kind == 2:
+            queries.append(name)
+        elif kind == 3:
+            # Prefixes as the user types them
+            queries.append(name[:rng.randint(2, max(2, min(len(name), 10)))])
+        elif kind == 4 and words:
+            queries.append(add_typo(rng.choice(words).lower(), rng))
+        elif kind == 5 and words:
+            queries.append(' '.join(add_typo(word.lower(), rng) for word in words[:2]))
+        elif kind == 6 and words:
+            # Short fragments match thousands of courses ('ion', 'ing', 'th')
+            word = rng.choice(words).lower()
+            size = rng.randint(1, 3)
+            start = rng.choice((0, len(word) - size))
+            queries.append(word[start:start + size])
+        elif kind == 7:
+            stopword = rng.choice(STOPWORDS)
+            if words and rng.random() < 0.5:
+                queries.append(f"{rng.choice(words).lower()} {stopword} the")
+            else:
+                queries.append(stopword)
+    return queries
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--queries', type=int, default=3000)
+    parser.add_argument('--limit', type=int, default=30)
+    parser.add_argument('--budget-ms', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=196)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    courses = load_courses()
+
+    start = time.perf_counter()
+    index = CourseSearchIndex(courses)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = build_queries(courses, args.queries, rng)
+    timings = []
+    empty = 0
+    for query in queries:
+        start = time.perf_counter()
+        results = index.search(query, limit=args.limit)
+        timings.append((time.perf_counter() - start) * 1000)
+        empty += not results
+
+    p99 = percentile(timings, 0.99)
+    slowest = sorted(zip(timings, queries), reverse=True)[:5]
+    print(f"catalog: {len(courses)} courses, index built in {build_ms:.0f} ms")
+    print(f"queries: {len(queries)} ({empty} with no results)")
+    print(f"mean {statistics.mean(timings):.2f} ms  "
+          f"p50 {percentile(timings, 0.50):.2f} ms  "
+          f"p95 {percentile(timings, 0.95):.2f} ms  "
+          f"p99 {p99:.2f} ms  "
+          f"max {max(timings):.2f} ms")
+    print("slowest: " + ', '.join(f"{query!r} {ms:.2f} ms" for ms, query in slowest))
+
+    if p99 > args.budget_ms:
+        print(f"FAIL: p99 {p99:.2f} ms is over the {args.budget_ms:.1f} ms budget")
+        return 1
+    print(f"OK: p99 within the {args.budget_ms:.1f} ms budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Supabase round trips for deleting an account's rows, by batch size.
+
+Runs super.delete_user_rows() against the local Supabase stand-in
+(app/utils/local_supabase.py) with --latency-ms added to every request, so
+the numbers depend on how many requests are made, not on the network. Each
+batch size gets a fresh in-memory database seeded with --rows messages for
+one user (and some for another user, which must survive).
+
+Run from the Project directory:
+    python benchmarks/bench_supabase_batching.py [--rows 400] [--latency-ms 5] [--batch-sizes 1,50,500]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+
+from app import super as sb  # noqa: E402
+from app.utils.local_supabase import LocalClient  # noqa: E402
+
+USER_ID, OTHER_USER_ID = 1, 2
+
+
+def seeded_client(rows, latency):
+    client = LocalClient(':memory:')
+    client.table('user').insert([
+        {'id': USER_ID, 'name': 'Deleted', 'email': 'deleted@illinois.edu'},
+        {'id': OTHER_USER_ID, 'name': 'Other', 'email': 'other@illinois.edu'},
+    ]).execute()
+    client.table('message').insert(
+        [{'course_code': 'CS 124', 'user_id': USER_ID, 'content': f'message {i}', 'is_deleted': False}
+         for i in range(rows)]
+        + [{'course_code': 'CS 124', 'user_id': OTHER_USER_ID, 'content': 'stays', 'is_deleted': False}] * 10
+    ).execute()
+    # Seeding doesn't count
+    client.latency = latency
+    client.reset_counters()
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=5)
+    parser.add_argument('--batch-sizes', default='1,50,500')
+    args = parser.parse_args()
+
+    print(f"{args.rows} rows, {args.latency_ms:.0f} ms per request\n")
+    print(f"{'batch':>6} {'requests':>9} {'ms':>9} {'deleted':>8}")
+    failed = False
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        client = seeded_client(args.rows, args.latency_ms / 1000)
+        sb.set_client(client)
+        start = time.perf_counter()
+        deleted = sb.delete_user_rows('message', USER_ID, batch_size)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{batch_size:>6} {client.requests:>9} {elapsed:>9.1f} {deleted:>8}")
+
+        left = client.table('message').select('user_id').execute().data
+        if deleted != args.rows or any(row['user_id'] == USER_ID for row in left) or len(left) != 10:
+            failed = True
+            print(f"FAIL: batch size {batch_size} left {len(left)} rows")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())